@@ -16,6 +16,48 @@ class Settings(BaseSettings):
     RESET_TOKEN_EXPIRE_MINUTES: int = 30
     FRONTEND_BASE_URL: str = "http://localhost:5173"
 
+    # --- 課程搜尋 count 快取 ---
+    SEARCH_COUNT_CACHE_TTL: int = 60          # 秒
+    SEARCH_COUNT_CACHE_SIZE: int = 2048
+    SEARCH_COUNT_ESTIMATE_THRESHOLD: int = 5000  # count_mode=auto 時，估計超過這個數就直接用估計值
+
+    # --- /courses/public 記憶體快照 ---
+    CATALOG_SNAPSHOT_ENABLED: bool = False
+    CATALOG_SNAPSHOT_TTL: int = 300           # 秒；多個 worker 時靠這個限制資料舊的程度
+
+    # --- /courses/meta 下拉選單資料快取 ---
+    CATALOG_META_TTL: int = 600               # 秒
+
+    # --- /courses/{id}、/courses/batch 單門課快取 ---
+    COURSE_DETAIL_CACHE_TTL: int = 300        # 秒
+    COURSE_DETAIL_CACHE_SIZE: int = 4096
+
+    # --- 背景匯出工作 ---
+    EXPORT_JOB_WORKERS: int = 2
+    EXPORT_JOB_TTL: int = 3600                # 秒；完成的檔案保留多久（可下載）
+    EXPORT_JOB_REUSE_TTL: int = 300           # 秒；同樣條件的新請求最多重用多舊的檔案
+    EXPORT_JOB_DIR: str = ""                  # 空字串 = 系統暫存目錄
+    EXPORT_JOB_MAX_PENDING: int = 20          # 排隊 + 執行中的匯出工作上限，超過 503
+
+    # --- /admin/import 分批匯入 ---
+    IMPORT_CHUNK_ROWS: int = 2000             # chunked=true 時每批列數（每批 commit 一次）
+    IMPORT_MAX_ERRORS: int = 200              # 回傳的錯誤明細最多幾筆
+    IMPORT_DIFF_DETAILS: int = 200            # dry_run 每一類明細最多幾筆
+    IMPORT_PARSE_WORKERS: int = 0             # 多檔 / 多工作表解析的 process 數；0 = CPU 核心數
+    IMPORT_JOB_WORKERS: int = 1               # 背景匯入（/admin/import/jobs）
+    IMPORT_JOB_TTL: int = 3600                # 秒；完成的工作狀態保留多久
+    IMPORT_JOB_DIR: str = ""                  # 上傳檔暫存目錄；空字串 = 系統暫存目錄
+
+    # --- get_current_user 使用者快取 ---
+    USER_CACHE_TTL: int = 30                  # 秒；後台修改會主動失效，這個只限制其他 worker 的舊資料
+    USER_CACHE_SIZE: int = 10000
+    TOKEN_VERSION_CACHE_TTL: int = 10         # 秒；其他 worker 撤銷的舊 token 最多還能用這麼久（新 token 不受影響，不一致會重讀）
+
+    # --- bcrypt 專用 executor（登入 / 註冊 / 重設密碼） ---
+    PASSWORD_HASH_EXECUTOR: str = "thread"    # thread / process
+    PASSWORD_HASH_WORKERS: int = 4            # 同時計算的上限
+    PASSWORD_HASH_MAX_QUEUE: int = 200        # 排隊上限，超過回 503
+
     # 設定檔配置
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -1,5 +1,5 @@
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, DDL
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
 
@@ -12,6 +12,9 @@ engine = create_engine(DATABASE_URL, echo=False)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# 全新資料庫 create_all 時，trigram 索引需要先有 pg_trgm（既有資料庫請跑 migrations/）
+event.listen(Base.metadata, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
 
 def get_db():
     db = SessionLocal()
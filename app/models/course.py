@@ -1,10 +1,16 @@
 
-from sqlalchemy import Column, String, Integer, Text, ForeignKey
+from sqlalchemy import Column, String, Integer, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import BIT
 from app.database import Base
 
 class Course(Base):
     __tablename__ = "courses"
+    __table_args__ = (
+        # 關鍵字 ILIKE '%k%' 用（見 migrations/001_course_search_trgm.sql）
+        Index("ix_courses_name_zh_trgm", "name_zh", postgresql_using="gin", postgresql_ops={"name_zh": "gin_trgm_ops"}),
+        Index("ix_courses_name_en_trgm", "name_en", postgresql_using="gin", postgresql_ops={"name_en": "gin_trgm_ops"}),
+    )
 
     id = Column(String(20), primary_key=True)
 
@@ -31,5 +37,11 @@ class Course(Base):
 
     semester = Column(String(10))
 
+    # 星期 x 節次 佔用 bitmask（見 app/utils/timeslots.py、migrations/002_course_time_mask.sql）
+    time_mask = Column(BIT(140))
+
+    # 匯入時的內容雜湊（見 app/utils/course_import.py content_hash、migrations/003_course_content_hash.sql）
+    content_hash = Column(String(64))
+
     
     times = relationship("CourseTime", back_populates="course")
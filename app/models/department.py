@@ -1,8 +1,11 @@
-from sqlalchemy import Column, String
+from sqlalchemy import Column, String, Index
 from app.database import Base
 
 class Department(Base):
     __tablename__ = "departments"
+    __table_args__ = (
+        Index("ix_departments_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
 
     id = Column(String(10), primary_key=True)
     name = Column(String(100), nullable=False)
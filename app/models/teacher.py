@@ -1,9 +1,12 @@
 
-from sqlalchemy import Column, String
+from sqlalchemy import Column, String, Index
 from app.database import Base
 
 class Teacher(Base):
     __tablename__ = "teachers"
+    __table_args__ = (
+        Index("ix_teachers_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+    )
 
     id = Column(String(10), primary_key=True)
     name = Column(String(100), nullable=False)
@@ -12,3 +12,6 @@ class User(Base):
     role = Column(String(20), nullable=False)
     created_at = Column(TIMESTAMP, default=datetime.utcnow)
     department_id = Column(String, ForeignKey("departments.id"), nullable=True)
+
+    # JWT tv claim 比對用（見 migrations/004_user_token_version.sql）
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
@@ -1,14 +1,14 @@
-import pandas as pd
 from pathlib import Path
-from typing import Optional, Literal
+from typing import List, Optional, Literal
 
 from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
 
 from sqlalchemy.orm import Session
 from sqlalchemy import or_
 
 from app.database import get_db
-from app.utils.auth import get_current_user,require_admin
+from app.utils.auth import get_current_user, require_admin, invalidate_user, revoke_tokens, user_cache_stats
 
 from app.models.course import Course
 from app.models.teacher import Teacher
@@ -26,7 +26,13 @@ from app.schemas.admin_user import (
     AdminResetPasswordIn,
 )
 
-from app.utils.hashing import hash_password as get_password_hash
+from app.utils.hashing import hash_password_async, password_hash_stats
+from app.utils.catalog_version import bump_catalog_version
+from app.config import settings
+from app.utils.course_import import (
+    ImportMode, bulk_import, diff_import, iter_sheet_chunks, import_chunked, parse_course_files, scan_sheet,
+)
+from app.utils.import_jobs import import_runner, remove_uploads, save_uploads, semester_lock, submit_import
 
 
 import logging
@@ -39,163 +45,102 @@ router = APIRouter(prefix="/admin", tags=["Admin"])
 
 
 
-#excel匯入功能
-def to_str(v):
-    if pd.isna(v):
-        return None
-    s = str(v).strip()
-    return None if s == "" or s.lower() == "nan" else s
-
-
-def to_int(v):
-    if pd.isna(v):
-        return None
-    try:
-        return int(float(v))
-    except Exception:
-        return None
-
-
-def parse_sections(text):
-    # "2,3,4" -> (2,4)
-    if text is None or (isinstance(text, float) and pd.isna(text)):
-        return None, None
-    try:
-        parts = [int(str(x).strip()) for x in str(text).split(",") if str(x).strip() != ""]
-        if not parts:
-            return None, None
-        return min(parts), max(parts)
-    except Exception:
-        return None, None
+def _uploads(file: Optional[UploadFile], files: Optional[List[UploadFile]]) -> List[UploadFile]:
+    uploads = ([file] if file is not None else []) + list(files or [])
+    if not uploads:
+        raise HTTPException(status_code=400, detail="No file uploaded")
+    return uploads
 
 
-def find_header_row(df_raw: pd.DataFrame) -> int:
-    # 找到包含「科目代碼(新碼全碼)」的那一列當表頭
-    target = "科目代碼(新碼全碼)"
-    for i in range(min(30, len(df_raw))):
-        row = df_raw.iloc[i].astype(str).tolist()
-        if any(target in cell for cell in row):
-            return i
-    return -1
+def _check_chunked(uploads: List[UploadFile]) -> None:
+    if len(uploads) != 1 or Path(uploads[0].filename or "").suffix.lower() != ".xlsx":
+        raise HTTPException(status_code=400, detail="chunked import only supports a single .xlsx")
 
 
-#匯入課程api
+#匯入課程api（可一次多個檔案；Excel 每個工作表都會讀）
 @router.post("/import")
 def import_courses(
-    file: UploadFile = File(...),
+    file: Optional[UploadFile] = File(None),
+    files: Optional[List[UploadFile]] = File(None, description="多個檔案（例如各學院一份）；合併後以課號去重"),
+    mode: ImportMode = Query("skip", description="skip：已存在的課程略過；update：內容有變就更新（時段整批換掉）"),
+    chunked: bool = Query(False, description="大檔用：逐段讀 .xlsx、每批 commit，回傳逐列錯誤報告"),
+    dry_run: bool = Query(False, description="只比對內容雜湊、回報新增 / 更新 / 未變 / 移除，不寫入"),
     admin=Depends(require_admin),
     db: Session = Depends(get_db),
 ):
+    uploads = _uploads(file, files)
+
+    if chunked and not dry_run:
+        _check_chunked(uploads)
+        f = uploads[0].file
+        semesters, _rows = scan_sheet(f, settings.IMPORT_CHUNK_ROWS)
+        f.seek(0)
+        try:
+            # 同一學期的匯入（含背景工作）一次一個
+            with semester_lock(semesters):
+                stats = import_chunked(db, iter_sheet_chunks(f, settings.IMPORT_CHUNK_ROWS), mode)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            # 中途失敗時，前面已 commit 的批次也要讓快取失效
+            bump_catalog_version("courses imported (chunked)")
+        return {"message": "Import completed!", **stats}
+
+    saved = save_uploads(uploads)
     try:
-        df_raw = pd.read_excel(file.file, header=None)
-        header_i = find_header_row(df_raw)
-        if header_i == -1:
-            raise HTTPException(status_code=400, detail="Cannot find header row in Excel")
-
-        header = df_raw.iloc[header_i].tolist()
-        df = df_raw.iloc[header_i + 1:].copy()
-        df.columns = [str(c).strip() for c in header]
-        df = df.reset_index(drop=True)
-
-        # 先準備 departments / teachers
-        dept_ids = set()
-        teachers = {}  # teacher_id -> name
-
-        for _, row in df.iterrows():
-            dept_id = to_str(row.get("系所代碼"))
-            if dept_id:
-                dept_ids.add(dept_id)
-
-            teacher_id = to_str(row.get("主開課教師代碼(舊碼)")) or to_str(row.get("授課教師代碼(舊碼)"))
-            teacher_name = to_str(row.get("主開課教師姓名")) or to_str(row.get("授課教師姓名"))
-            if teacher_id:
-                teachers[teacher_id] = teacher_name or "unknown"
-
-        # 插入 departments
-        for dept_id in dept_ids:
-            exists = db.query(Department.id).filter(Department.id == dept_id).first()
-            if not exists:
-                db.add(Department(id=dept_id, name=""))  # 沒有系所名稱就先空字串
-
-        # 插入 teachers
-        for tid, tname in teachers.items():
-            exists = db.query(Teacher.id).filter(Teacher.id == tid).first()
-            if not exists:
-                db.add(Teacher(id=tid, name=tname))
-
-        db.commit()  # 先確保 FK 都存在
-
-        # 匯入 courses / course_time 
-        inserted_courses = 0
-        inserted_times = 0
-
-        for _, row in df.iterrows():
-            course_id = to_str(row.get("科目代碼(新碼全碼)"))
-            if not course_id:
-                continue
-
-            # 只查 id，避免重複插入
-            if db.query(Course.id).filter(Course.id == course_id).first():
-                continue
-
-            dept_id = to_str(row.get("系所代碼")) or "unknown"
-            teacher_id = (
-                to_str(row.get("主開課教師代碼(舊碼)"))
-                or to_str(row.get("授課教師代碼(舊碼)"))
-                or "unknown"
-            )
-
-            course = Course(
-                id=course_id,
-                name_zh=to_str(row.get("科目中文名稱")) or "",
-                name_en=to_str(row.get("科目英文名稱")),
-                department_id=dept_id,
-                teacher_id=teacher_id,
-                grade=to_int(row.get("年級")),
-                class_group=to_str(row.get("上課班組")),
-                group_code=to_str(row.get("科目組別")),
-                credit=to_int(row.get("學分數")) or 0,
-                required_type=to_str(row.get("課別名稱")),
-                category=to_str(row.get("課別代碼")),
-                limit_max=to_int(row.get("上課人數")),
-                chinese_summary=to_str(row.get("課程中文摘要")),
-                english_summary=to_str(row.get("課程英文摘要")),
-                raw_remark=to_str(row.get("課表備註")),
-                semester=to_str(row.get("學期")),
-            )
-            db.add(course)
-            inserted_courses += 1
-
-            weekday = to_int(row.get("上課星期"))
-            sections = to_str(row.get("上課節次"))
-            classroom = to_str(row.get("上課地點"))
-
-            if weekday is not None and sections:
-                start, end = parse_sections(sections)
-                if start is not None and end is not None:
-                    db.add(
-                        CourseTime(
-                            course_id=course_id,
-                            weekday=weekday,
-                            start_section=start,
-                            end_section=end,
-                            classroom=classroom,
-                        )
-                    )
-                    inserted_times += 1
-
-        db.commit()
-        return {
-            "message": "Import completed!",
-            "inserted_courses": inserted_courses,
-            "inserted_times": inserted_times,
-        }
+        # 各檔案 / 工作表在 process pool 平行解析，合併去重後一次寫入
+        parsed = parse_course_files(saved)
+        if dry_run:
+            return diff_import(db, parsed, settings.IMPORT_DIFF_DETAILS)
+
+        semesters = {c["semester"] for c in parsed.courses.values() if c["semester"]}
+
+        # 每張表一個查詢拿既有 key + 批次 INSERT ... ON CONFLICT
+        with semester_lock(semesters):
+            stats = bulk_import(db, parsed, mode)
+            db.commit()
+        bump_catalog_version("courses imported")
+        return {"message": "Import completed!", "files": len(saved), "rows": parsed.rows, **stats}
 
     except Exception:
         db.rollback()
         raise
+    finally:
+        remove_uploads(saved)
+
+
+def _import_job_out(job) -> dict:
+    out = job.to_dict()
+    out["status_url"] = f"/admin/import/jobs/{job.id}"
+    if job.status == "done":
+        out["result"] = job.result
+    return out
+
+
+#背景匯入：大檔不卡住 request，之後用 GET /admin/import/jobs/{id} 查進度
+@router.post("/import/jobs", status_code=202)
+def create_import_job(
+    file: Optional[UploadFile] = File(None),
+    files: Optional[List[UploadFile]] = File(None, description="多個檔案（例如各學院一份）；合併後以課號去重"),
+    mode: ImportMode = Query("skip", description="skip：已存在的課程略過；update：內容有變就更新（時段整批換掉）"),
+    chunked: bool = Query(False, description="大檔用：逐段讀 .xlsx、每批 commit，回傳逐列錯誤報告"),
+    admin=Depends(require_admin),
+):
+    uploads = _uploads(file, files)
+    if chunked:
+        _check_chunked(uploads)
+    job = submit_import(uploads, mode, chunked)
+    return _import_job_out(job)
 
 
+@router.get("/import/jobs/{job_id}")
+def get_import_job(job_id: str, admin=Depends(require_admin)):
+    job = import_runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return _import_job_out(job)
+
 
 
 
@@ -329,6 +274,7 @@ def admin_update_user(
     u = db.query(User).filter(User.id == user_id).first()
     if not u:
         raise HTTPException(status_code=404, detail="User not found")
+    old_username = u.username
 
     data = body.model_dump(exclude_unset=True)
 
@@ -362,6 +308,8 @@ def admin_update_user(
 
     
     if "role" in data and data["role"] is not None:
+        if data["role"] != u.role:
+            revoke_tokens(u)
         u.role = data["role"]
     if "is_active" in data and data["is_active"] is not None:
         u.is_active = data["is_active"]
@@ -375,9 +323,13 @@ def admin_update_user(
 
         #同步更新
         p.student_no = new_no
+        if new_no != u.username:
+            revoke_tokens(u)
         u.username = new_no
         
     db.commit()
+    # 角色 / 帳號 / 系所可能變了，登入快取要重新讀
+    invalidate_user(old_username, u.username, user_id=u.id)
     db.refresh(u)
     db.refresh(p)
     dept_name = None
@@ -392,19 +344,31 @@ def admin_update_user(
     out = out.model_copy(update={"department_name": dept_name})
     return out
 
+def _get_user_or_404(db: Session, user_id: int) -> User:
+    u = db.query(User).filter(User.id == user_id).first()
+    if not u:
+        raise HTTPException(status_code=404, detail="User not found")
+    return u
+
+
+def _set_password(db: Session, u: User, password_hash: str) -> None:
+    u.password_hash = password_hash
+    revoke_tokens(u)
+    db.commit()
+    invalidate_user(u.username, user_id=u.id)
+
+
+#async：bcrypt 在 hashing 的專用 executor 算，DB 的部分丟 thread pool
 @router.patch("/users/{user_id}/password")
-def admin_reset_password(
+async def admin_reset_password(
     user_id: int,
     body: AdminResetPasswordIn,
     db: Session = Depends(get_db),
     admin=Depends(require_admin),
 ):
-    u = db.query(User).filter(User.id == user_id).first()
-    if not u:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    u.password_hash = get_password_hash(body.new_password)
-    db.commit()
+    u = await run_in_threadpool(_get_user_or_404, db, user_id)
+    password_hash = await hash_password_async(body.new_password)
+    await run_in_threadpool(_set_password, db, u, password_hash)
     return {"detail": "password updated"}
 
 @router.delete("/users/{user_id}")
@@ -417,6 +381,20 @@ def admin_delete_user(
     if not u:
         raise HTTPException(status_code=404, detail="User not found")
 
+    username = u.username
     db.delete(u)
     db.commit()
+    invalidate_user(username, user_id=user_id)
     return {"detail": "user deleted"}
+
+
+#登入使用者快取命中率
+@router.get("/cache/users")
+def admin_user_cache_stats(admin=Depends(require_admin)):
+    return user_cache_stats()
+
+
+#bcrypt executor 的排隊狀況（同時計算數、排隊、等待時間、被拒絕次數）
+@router.get("/metrics/password-hash")
+def admin_password_hash_stats(admin=Depends(require_admin)):
+    return password_hash_stats()
@@ -13,13 +13,14 @@ from app.models.course_time import CourseTime
 from app.models.teacher import Teacher
 from app.models.department import Department
 
-from app.utils.timeslots import parse_time_slots, compress_slots_to_ranges
+from app.utils.timeslots import parse_time_slots, compress_slots_to_ranges, ranges_to_mask, mask_to_bits
 from app.schemas.admin_course import (
     AdminCourseCreate, AdminCourseUpdate,
     AdminCourseOut, AdminCourseListOut,
     CourseTimeIn,
 )
 from app.schemas.admin_course_timegrid import TimeGridUpdate
+from app.utils.catalog_version import bump_catalog_version
 
 import logging
 logger = logging.getLogger("app.admin")
@@ -102,6 +103,7 @@ def admin_create_course(
     slots = parse_time_slots(body.time_slots)
     if slots:
         ranges = compress_slots_to_ranges(slots)
+        c.time_mask = mask_to_bits(ranges_to_mask(ranges))
         for w, start, end in ranges:
             db.add(CourseTime(
                 course_id=body.id,
@@ -111,6 +113,7 @@ def admin_create_course(
                 classroom=body.classroom,
             ))
     else:
+        c.time_mask = mask_to_bits(ranges_to_mask((t.weekday, t.start_section, t.end_section) for t in body.times))
         for t in body.times:
             db.add(CourseTime(
                 course_id=body.id,
@@ -121,6 +124,7 @@ def admin_create_course(
             ))
 
     db.commit()
+    bump_catalog_version("course created")
     db.refresh(c)
     return AdminCourseOut.model_validate(c)
 
@@ -174,6 +178,7 @@ def admin_update_course(
     # 更新 Course 基本欄位
     for k, v in data.items():
         setattr(c, k, v)
+    c.content_hash = None  # 手動改過，下次匯入一律視為有變
 
     #  是否要更新時間
     wants_update_time = (times_in is not None) or (time_slots_in is not None) or (classroom_in is not None)
@@ -183,9 +188,11 @@ def admin_update_course(
         db.query(CourseTime).filter(CourseTime.course_id == course_id).delete(synchronize_session=False)
 
         
+        c.time_mask = mask_to_bits(0)
         if time_slots_in is not None:
             slots = parse_time_slots(time_slots_in or [])
             ranges = compress_slots_to_ranges(slots)
+            c.time_mask = mask_to_bits(ranges_to_mask(ranges))
             for w, start, end in ranges:
                 db.add(CourseTime(
                     course_id=course_id,
@@ -195,6 +202,11 @@ def admin_update_course(
                     classroom=classroom_in,  
                 ))
         elif times_in is not None:
+            c.time_mask = mask_to_bits(ranges_to_mask(
+                (t["weekday"], t["start_section"], t["end_section"]) if isinstance(t, dict)
+                else (t.weekday, t.start_section, t.end_section)
+                for t in (times_in or [])
+            ))
             for t in (times_in or []):
                 db.add(CourseTime(
                     course_id=course_id,
@@ -210,6 +222,7 @@ def admin_update_course(
     except IntegrityError as e:
         db.rollback()
         raise HTTPException(status_code=400, detail=str(e.orig))
+    bump_catalog_version("course updated")
 
     db.refresh(c)
     return AdminCourseOut.model_validate(c)
@@ -229,6 +242,7 @@ def admin_delete_course(
     db.query(CourseTime).filter(CourseTime.course_id == course_id).delete()
     db.delete(c)
     db.commit()
+    bump_catalog_version("course deleted")
     return {"detail": "deleted"}
 
 
@@ -260,11 +274,14 @@ def admin_replace_course_times_by_grid(
     db: Session = Depends(get_db),
     admin=Depends(require_admin),
 ):
-    if not db.query(Course.id).filter(Course.id == course_id).first():
+    c = db.query(Course).filter(Course.id == course_id).first()
+    if not c:
         raise HTTPException(status_code=404, detail="Course not found")
 
     slots = parse_time_slots(body.time_slots)
     ranges = compress_slots_to_ranges(slots)
+    c.time_mask = mask_to_bits(ranges_to_mask(ranges))
+    c.content_hash = None
 
     # 全刪重建
     db.query(CourseTime).filter(CourseTime.course_id == course_id).delete()
@@ -279,4 +296,5 @@ def admin_replace_course_times_by_grid(
         ))
 
     db.commit()
+    bump_catalog_version("course times replaced")
     return {"detail": "times replaced", "ranges": ranges}
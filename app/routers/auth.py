@@ -1,12 +1,13 @@
 
 from fastapi import APIRouter, Depends, HTTPException
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 import hashlib
 from datetime import datetime, timedelta
 import secrets
 from app.database import get_db
-from app.utils.hashing import hash_password, verify_password
-from app.utils.auth import create_access_token, get_current_user
+from app.utils.hashing import hash_password_async, verify_password_async
+from app.utils.auth import create_access_token, get_current_user, invalidate_user, revoke_tokens, token_claims
 from app.schemas.user import UserCreate, UserLogin, UserOut
 from app.models.user import User
 from fastapi.security import OAuth2PasswordRequestForm
@@ -31,17 +32,16 @@ def sha256(s: str) -> str:
 RESET_TTL_MINUTES = 15
 
 
-# 註冊
-@router.post("/register", response_model=UserOut)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+# 註冊 / 登入 / 重設密碼是 async：bcrypt 在 hashing 的專用 executor 算，
+# DB 的部分用 run_in_threadpool，不會卡住 event loop，也不會佔著 thread pool 等 bcrypt
+def _find_user(db: Session, username: str):
+    return db.query(User).filter(User.username == username).first()
 
-    exists = db.query(User).filter(User.username == user_data.username).first()
-    if exists:
-        raise HTTPException(status_code=400, detail="Username already exists")
 
+def _create_user(db: Session, username: str, password_hash: str) -> User:
     new_user = User(
-        username=user_data.username,
-        password_hash=hash_password(user_data.password),
+        username=username,
+        password_hash=password_hash,
         role="student"
     )
     db.add(new_user)
@@ -50,12 +50,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     return new_user
 
 
-# 登入
-@router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
-        raise HTTPException(status_code=403, detail="Invalid credentials")
+def _finish_login(db: Session, user: User) -> str:
     profile = db.query(StudentProfile).filter(StudentProfile.user_id == user.id).first()
     if profile is None:
         profile = StudentProfile(user_id=user.id, student_no=user.username)  
@@ -63,7 +58,29 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
 
     profile.last_login_at = datetime.now(timezone.utc)
     db.commit()
-    token = create_access_token({"sub": user.username})
+    return create_access_token(token_claims(user))
+
+
+# 註冊
+@router.post("/register", response_model=UserOut)
+async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+
+    exists = await run_in_threadpool(_find_user, db, user_data.username)
+    if exists:
+        raise HTTPException(status_code=400, detail="Username already exists")
+
+    password_hash = await hash_password_async(user_data.password)
+    return await run_in_threadpool(_create_user, db, user_data.username, password_hash)
+
+
+# 登入
+@router.post("/login")
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = await run_in_threadpool(_find_user, db, form_data.username)
+    if not user or not await verify_password_async(form_data.password, user.password_hash):
+        raise HTTPException(status_code=403, detail="Invalid credentials")
+
+    token = await run_in_threadpool(_finish_login, db, user)
     return {"access_token": token, "token_type": "bearer"}
 
 
@@ -110,12 +127,7 @@ def forgot_password(body: ForgotPasswordIn, db: Session = Depends(get_db)):
     }
 
 
-@router.post("/reset-password")
-def reset_password(body: ResetPasswordIn, db: Session = Depends(get_db)):
-    
-    if len(body.new_password.encode("utf-8")) > 72:
-        raise HTTPException(stadtus_code=400, detail="Passwor too long (max 72 bytes for bcrypt).")
-
+def _check_reset_token(db: Session, body: ResetPasswordIn):
     user = db.query(User).filter(User.username == body.username.strip()).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -132,10 +144,23 @@ def reset_password(body: ResetPasswordIn, db: Session = Depends(get_db)):
 
     if row.token_hash != sha256(body.token):
         raise HTTPException(status_code=400, detail="Invalid token")
+    return user, row
 
-    #  通過驗證，重設密碼
-    user.password_hash = hash_password(body.new_password)
+
+def _apply_reset(db: Session, user: User, row: PasswordResetToken, password_hash: str) -> None:
+    user.password_hash = password_hash
     row.used_at = datetime.utcnow()
+    revoke_tokens(user)
 
     db.commit()
+    invalidate_user(user.username, user_id=user.id)
+
+
+@router.post("/reset-password")
+async def reset_password(body: ResetPasswordIn, db: Session = Depends(get_db)):
+    user, row = await run_in_threadpool(_check_reset_token, db, body)
+
+    #  通過驗證，重設密碼（長度超過 bcrypt 上限會回 400）
+    password_hash = await hash_password_async(body.new_password)
+    await run_in_threadpool(_apply_reset, db, user, row, password_hash)
     return {"detail": "Password reset"}
\ No newline at end of file
@@ -16,14 +16,15 @@ from app.models.comment import Comment
 from app.models.course import Course
 from app.models.course_like import CourseLike
 
-from app.models.teacher import Teacher
 from app.models.department import Department
-from app.models.course_time import CourseTime
-from app.utils.timeslots import parse_time_slots
+from app.utils.course_filters import CourseFilters, course_filter_params, page_stmt
+from app.utils.course_rows import load_course_rows
+from app.utils.search_count import exact_count
+from app.utils.cursor import encode_cursor, decode_cursor
 
 from typing import Optional
 from fastapi import Query
-from sqlalchemy import func, or_, and_, tuple_
+from sqlalchemy import func
 
 from app.models.student_profile import StudentProfile
 from app.models.user import User
@@ -56,101 +57,37 @@ def search_courses_with_comments(
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 
-    keyword: Optional[str] = Query(None, description="課程名稱關鍵字（中/英）"),
-    semester: Optional[str] = Query(None, description="學期，例如 1141"),
-    required_type: Optional[str] = Query(None, description="課別，例如 專業必修(系所)"),
-    grade: Optional[int] = Query(None, description="年級"),
-    teacher: Optional[str] = Query(None, description="教師（可用代碼或姓名關鍵字）"),
-    category: Optional[str] = Query(None, description="課程分類（category 欄位）"),
-    department: Optional[str] = Query(None, description="系所（可輸入代碼或名稱關鍵字）"),
-
-    time_slots: list[str] | None = Query(None, description="多選: 1-1,1-2,3-5..."),
-    weekday: Optional[int] = Query(None, ge=1, le=7, description="上課星期 1~7"),
-    start_section: Optional[int] = Query(None, ge=1, le=15, description="起始節次"),
-    end_section: Optional[int] = Query(None, ge=1, le=15, description="結束節次"),
+    filters: CourseFilters = Depends(course_filter_params),
 
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="上一頁回傳的 next_cursor（帶了就忽略 page）"),
 
     comment_limit: int = Query(5, ge=1, le=50, description="每門課最多回傳幾則最新留言"),
 ):
-    #先查課程
-    q = (
-        db.query(
-            Course,
-            Teacher.name.label("teacher_name"),
-            Department.id.label("department_id"),
-            Department.name.label("department_name"),
-        )
-        .outerjoin(Teacher, Teacher.id == Course.teacher_id)
-        .outerjoin(Department, Department.id == Course.department_id)
-    )
+    #先查這一頁的課程 id
+    params = filters.params()
+    if cursor:
+        params.update(last_id=decode_cursor(cursor)["id"], offset=0)
+        total = None
+    else:
+        total = exact_count(db, filters)
+        params["offset"] = (page - 1) * page_size
+    params["limit"] = page_size + 1
 
-    if keyword:
-        k = f"%{keyword.strip()}%"
-        q = q.filter(or_(Course.name_zh.ilike(k), Course.name_en.ilike(k)))
-
-    if semester:
-        q = q.filter(Course.semester == semester)
-
-    if required_type:
-        q = q.filter(Course.required_type == required_type)
-
-    if grade is not None:
-        q = q.filter(Course.grade == grade)
-
-    if category:
-        q = q.filter(Course.category == category)
-
-    if department:
-        d = department.strip()
-        q = q.filter(or_(Course.department_id == d, Department.name.ilike(f"%{d}%")))
-
-    if teacher:
-        t = teacher.strip()
-        q = q.filter(or_(Course.teacher_id == t, Teacher.name.ilike(f"%{t}%")))
-
-    # 時間篩選（需要 join CourseTime 才能 filter)
-    slots = parse_time_slots(time_slots)  # 回傳 [(weekday, sec), ...]
-    if weekday is not None or start_section is not None or end_section is not None or slots:
-        q = q.join(CourseTime, CourseTime.course_id == Course.id)
-
-    if weekday is not None:
-        q = q.filter(CourseTime.weekday == weekday)
-
-    if slots:
-        slot_filters = [
-            and_(
-                CourseTime.weekday == w,
-                CourseTime.start_section <= sec,
-                CourseTime.end_section >= sec,
-            )
-            for (w, sec) in slots
-        ]
-        q = q.filter(or_(*slot_filters))
-
-    if start_section is not None and end_section is not None:
-        q = q.filter(and_(CourseTime.start_section >= start_section, CourseTime.end_section <= end_section))
-    elif start_section is not None:
-        q = q.filter(CourseTime.start_section >= start_section)
-    elif end_section is not None:
-        q = q.filter(CourseTime.end_section <= end_section)
-
-    if weekday is not None or start_section is not None or end_section is not None or slots:
-        q = q.distinct(Course.id)
-
-    total = q.count()
-
-    course_rows = (
-        q.order_by(Course.id.asc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
-    )
+    stmt = page_stmt(filters.shape, seek="id" if cursor else None)
+    page_ids = db.execute(stmt, params).scalars().all()
+    next_cursor = None
+    if len(page_ids) > page_size:
+        page_ids = page_ids[:page_size]
+        next_cursor = encode_cursor({"id": page_ids[-1]})
 
     # 沒有課就直接回傳
-    if not course_rows:
-        return {"page": page, "page_size": page_size, "total": total, "items": []}
+    if not page_ids:
+        return {"page": page, "page_size": page_size, "total": total, "next_cursor": None, "items": []}
+
+    row_map = load_course_rows(db, page_ids)
+    course_rows = [row_map[cid] for cid in page_ids if cid in row_map]
 
     course_ids = [course.id for course, *_ in course_rows]
 
@@ -244,7 +181,7 @@ def search_courses_with_comments(
             "comments": comments_map.get(course.id, []),
         })
 
-    return {"page": page, "page_size": page_size, "total": total, "items": items}
+    return {"page": page, "page_size": page_size, "total": total, "next_cursor": next_cursor, "items": items}
 
 
 @router.get("/{course_id}/comments")
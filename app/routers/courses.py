@@ -1,9 +1,8 @@
 # app/routers/courses.py
-from typing import Optional
-from fastapi import APIRouter, Depends, Query
+from typing import List, Optional, Literal
+from fastapi import APIRouter, Depends, Query, Header, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, JSONResponse, FileResponse
 from fastapi import HTTPException
 
 
@@ -12,17 +11,24 @@ from app.models.course import Course
 from app.models.teacher import Teacher
 from app.models.department import Department
 from app.models.course_time import CourseTime
-from app.utils.timeslots import parse_time_slots
+from app.utils.course_filters import CourseFilters, course_filter_params, page_stmt
 
 from app.schemas.course_detail import CourseDetailOut, CourseTimeOut
-from app.utils.excel_export import courses_to_xlsx_bytes, make_filename
-from app.models.favorite import Favorite
-from app.utils.auth import get_current_user
-from sqlalchemy import exists
-from sqlalchemy import func, cast,tuple_
-from sqlalchemy.dialects.postgresql import JSONB, aggregate_order_by
-
-from collections import OrderedDict
+from app.utils.excel_export import iter_file, make_filename
+from app.utils.course_export import (
+    ExportFormat, MEDIA_TYPES, iter_export_rows, iter_export_stream, write_export_file,
+)
+from app.utils.course_rows import build_course_items
+from app.utils.cursor import encode_cursor, decode_cursor
+from app.utils.search_count import CountMode, cached_count
+from app.utils.catalog_snapshot import get_snapshot
+from app.utils.course_facets import query_facets, snapshot_facets
+from app.utils.catalog_meta import get_catalog_meta, etag_matches
+from app.utils.course_suggest import get_suggest_index
+from app.utils.course_detail import get_course_details
+from app.utils.export_jobs import export_runner, submit_export
+from app.config import settings
+from app.utils.auth import get_token_user
 
 
 router = APIRouter(prefix="/courses", tags=["Courses"])
@@ -34,532 +40,281 @@ logger = logging.getLogger("app.admin")
 @router.get("")
 def search_courses(
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
-
-    keyword: Optional[str] = Query(None, description="課程名稱關鍵字（中/英）"),
-    semester: Optional[str] = Query(None, description="學期，例如 1141"),
-    required_type: Optional[str] = Query(None, description="課別，例如 專業必修(系所)"),
-    grade: Optional[int] = Query(None, description="年級"),
-    teacher: Optional[str] = Query(None, description="教師（可用代碼或姓名關鍵字）"),
-    category: Optional[str] = Query(None, description="課程分類（category 欄位）"),
-
-    # 同時支援「系所代碼」或「系所名稱」
-    department: Optional[str] = Query(None, description="系所（可輸入代碼或名稱關鍵字）"),
-
-    time_slots: list[str] | None = Query(None, description="多選: 1-1,1-2,3-5..."),
-
-    weekday: Optional[int] = Query(None, ge=1, le=7, description="上課星期 1~7"),
-    start_section: Optional[int] = Query(None, ge=1, le=15, description="起始節次"),
-    end_section: Optional[int] = Query(None, ge=1, le=15, description="結束節次"),
+    user=Depends(get_token_user),
+    filters: CourseFilters = Depends(course_filter_params),
 
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="上一頁回傳的 next_cursor（無限捲動用，帶了就忽略 page）"),
+    include_total: bool = Query(True, description="false 則不計算 total"),
+    count_mode: CountMode = Query("exact", description="exact / estimated / auto（很寬的查詢用估計值）"),
+    sort: Literal["default", "relevance"] = Query("default", description="relevance：依關鍵字相關度排序（需搭配 keyword）"),
 ):
-    
-    is_fav_expr = exists().where(
-        and_(
-            Favorite.user_id == user.id,
-            Favorite.course_id == Course.id,
-        )
-    )
-
-    
-    times_sq = (
-        db.query(
-            CourseTime.course_id.label("cid"),
-            func.coalesce(
-                func.jsonb_agg(
-                    aggregate_order_by(
-                        func.jsonb_build_object(
-                            "weekday", CourseTime.weekday,
-                            "start_section", CourseTime.start_section,
-                            "end_section", CourseTime.end_section,
-                            "classroom", CourseTime.classroom,
-                        ),
-                        tuple_(CourseTime.weekday, CourseTime.start_section),
-                    )
-                ),
-                cast("[]", JSONB),
-            ).label("times"),
-        )
-        .group_by(CourseTime.course_id)
-        .subquery()
-    )
-
-    q = (
-        db.query(
-            Course,
-            Teacher.name.label("teacher_name"),
-            Department.id.label("department_id"),
-            Department.name.label("department_name"),
-            is_fav_expr.label("is_favorite"),
-            times_sq.c.times.label("times"),
-        )
-        .outerjoin(Teacher, Teacher.id == Course.teacher_id)
-        .outerjoin(Department, Department.id == Course.department_id)
-        .outerjoin(times_sq, times_sq.c.cid == Course.id)
-    )
-
-    # 一般篩選
-    if keyword:
-        k = f"%{keyword.strip()}%"
-        q = q.filter(or_(Course.name_zh.ilike(k), Course.name_en.ilike(k)))
-
-    if semester:
-        q = q.filter(Course.semester == semester)
-
-    if required_type:
-        q = q.filter(Course.required_type == required_type)
-
-    if grade is not None:
-        q = q.filter(Course.grade == grade)
-
-    if category:
-        q = q.filter(Course.category == category)
-
-    if department:
-        d = department.strip()
-        q = q.filter(or_(
-            Course.department_id == d,          # 代碼
-            Department.name.ilike(f"%{d}%"),    # 名稱
-        ))
-
-    if teacher:
-        t = teacher.strip()
-        q = q.filter(or_(Course.teacher_id == t, Teacher.name.ilike(f"%{t}%")))
-
-    #時間篩選（需要 join CourseTime 才能 filter）
-    slots = parse_time_slots(time_slots)
-    if weekday is not None or start_section is not None or end_section is not None or slots:
-        q = q.join(CourseTime, CourseTime.course_id == Course.id)
-
-    if weekday is not None:
-        q = q.filter(CourseTime.weekday == weekday)
-
-    if slots:
-        slot_filters = [
-            and_(
-                CourseTime.weekday == w,
-                CourseTime.start_section <= sec,
-                CourseTime.end_section >= sec,
-            )
-            for (w, sec) in slots
-        ]
-        q = q.filter(or_(*slot_filters))
-
-    # 只要完全落在 start_section ~ end_section 之間
-    if start_section is not None and end_section is not None:
-        q = q.filter(
-            and_(
-                CourseTime.start_section >= start_section,
-                CourseTime.end_section <= end_section,
-            )
-        )
-    elif start_section is not None:
-        q = q.filter(CourseTime.start_section >= start_section)
-    elif end_section is not None:
-        q = q.filter(CourseTime.end_section <= end_section)
-
-    # 有使用時間條件才去 distinct，避免同一課多個時段重複
-    if weekday is not None or start_section is not None or end_section is not None or slots:
-        
-        q = q.distinct()
-
-    total = q.count()
-
-    
-    rows = (
-        q.order_by(is_fav_expr.desc(), Course.id.asc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
-    )
-
-    items = []
-    for course, teacher_name, dept_id, dept_name, is_favorite, times in rows:
-        items.append({
-            "id": course.id,
-            "name_zh": course.name_zh,
-            "name_en": course.name_en,
-            "semester": course.semester,
-            "grade": course.grade,
-            "required_type": course.required_type,
-            "category": course.category,
-
-            "department_id": dept_id,
-            "department_name": dept_name,
-
-            "teacher_id": course.teacher_id,
-            "teacher_name": teacher_name,
-            "credit": course.credit,
-            "class_group": course.class_group,
-            "group_code": course.group_code,
-            "limit_min": course.limit_min,
-            "limit_max": course.limit_max,
-            "raw_remark": course.raw_remark,
-
-            "is_favorite": bool(is_favorite),
-            "times": times or [],
-        })
-
-    return {"page": page, "page_size": page_size, "total": total, "items": items}
+    by_relevance = sort == "relevance" and filters.keyword is not None
+    if by_relevance and cursor:
+        raise HTTPException(status_code=400, detail="cursor 只支援預設排序")
+
+    # 第一段：只查「符合條件 + 排序後」的 course_id，不聚合 times
+    # cursor：排序鍵是 (is_favorite desc, id asc)，用 seek 條件取代 OFFSET，也不再 count
+    params = filters.params()
+    params["user_id"] = user.id
+    total, total_estimated, seek = None, False, None
+    if cursor:
+        key = decode_cursor(cursor)
+        seek = "fav_true" if key.get("f") else "fav_false"
+        params.update(last_id=key["id"], offset=0)
+    else:
+        if include_total:
+            total, total_estimated = cached_count(db, filters, count_mode)
+        params["offset"] = (page - 1) * page_size
+    # 多拿一筆判斷還有沒有下一頁
+    params["limit"] = page_size + 1
+
+    stmt = page_stmt(filters.shape, True, "relevance" if by_relevance else "favorite", seek)
+    page_rows = db.execute(stmt, params).all()
+    next_cursor = None
+    if len(page_rows) > page_size:
+        page_rows = page_rows[:page_size]
+        if not by_relevance:
+            last_id, last_fav = page_rows[-1]
+            next_cursor = encode_cursor({"f": bool(last_fav), "id": last_id})
+
+    # 第二段：只針對這一頁的 id 補 teacher / department / times
+    course_ids = [cid for cid, _ in page_rows]
+    extras = {cid: {"is_favorite": bool(is_favorite)} for cid, is_favorite in page_rows}
+    items = build_course_items(db, course_ids, extras)
+
+    return {
+        "page": page, "page_size": page_size, "total": total,
+        "total_estimated": total_estimated, "next_cursor": next_cursor, "items": items,
+    }
 @router.get("/public")
 def search_courses_public(
     db: Session = Depends(get_db),
-
-    keyword: Optional[str] = Query(None, description="課程名稱關鍵字（中/英）"),
-    semester: Optional[str] = Query(None, description="學期，例如 1141"),
-    required_type: Optional[str] = Query(None, description="課別，例如 專業必修(系所)"),
-    grade: Optional[int] = Query(None, description="年級"),
-    teacher: Optional[str] = Query(None, description="教師（可用代碼或姓名關鍵字）"),
-    category: Optional[str] = Query(None, description="課程分類（category 欄位）"),
-
-   
-    department: Optional[str] = Query(None, description="系所（可輸入代碼或名稱關鍵字）"),
-
-    time_slots: list[str] | None = Query(None, description="多選: 1-1,1-2,3-5..."),
-
-    weekday: Optional[int] = Query(None, ge=1, le=7, description="上課星期 1~7"),
-    start_section: Optional[int] = Query(None, ge=1, le=15, description="起始節次"),
-    end_section: Optional[int] = Query(None, ge=1, le=15, description="結束節次"),
+    filters: CourseFilters = Depends(course_filter_params),
 
     page: int = Query(1, ge=1),
     page_size: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="上一頁回傳的 next_cursor（無限捲動用，帶了就忽略 page）"),
+    include_total: bool = Query(True, description="false 則不計算 total"),
+    count_mode: CountMode = Query("exact", description="exact / estimated / auto（很寬的查詢用估計值）"),
+    sort: Literal["default", "relevance"] = Query("default", description="relevance：依關鍵字相關度排序（需搭配 keyword）"),
 ):
-    # times 聚合
-    times_sq = (
-        db.query(
-            CourseTime.course_id.label("cid"),
-            func.coalesce(
-                func.jsonb_agg(
-                    aggregate_order_by(
-                        func.jsonb_build_object(
-                            "weekday", CourseTime.weekday,
-                            "start_section", CourseTime.start_section,
-                            "end_section", CourseTime.end_section,
-                            "classroom", CourseTime.classroom,
-                        ),
-                        tuple_(CourseTime.weekday, CourseTime.start_section),
-                    )
-                ),
-                cast("[]", JSONB),
-            ).label("times"),
-        )
-        .group_by(CourseTime.course_id)
-        .subquery()
-    )
-
-    q = (
-        db.query(
-            Course,
-            Teacher.name.label("teacher_name"),
-            Department.id.label("department_id"),
-            Department.name.label("department_name"),
-            times_sq.c.times.label("times"),
-        )
-        .outerjoin(Teacher, Teacher.id == Course.teacher_id)
-        .outerjoin(Department, Department.id == Course.department_id)
-        .outerjoin(times_sq, times_sq.c.cid == Course.id)
-    )
-
-    # 篩選
-    if keyword:
-        k = f"%{keyword.strip()}%"
-        q = q.filter(or_(Course.name_zh.ilike(k), Course.name_en.ilike(k)))
-
-    if semester:
-        q = q.filter(Course.semester == semester)
-
-    if required_type:
-        q = q.filter(Course.required_type == required_type)
-
-    if grade is not None:
-        q = q.filter(Course.grade == grade)
-
-    if category:
-        q = q.filter(Course.category == category)
-
-    #  department：代碼或名稱
-    if department:
-        d = department.strip()
-        q = q.filter(or_(
-            Course.department_id == d,
-            Department.name.ilike(f"%{d}%")
-        ))
-
-    if teacher:
-        t = teacher.strip()
-        q = q.filter(or_(Course.teacher_id == t, Teacher.name.ilike(f"%{t}%")))
-
-    # 時間篩選（需要 join CourseTime 才能 filter
-    slots = parse_time_slots(time_slots)
-    if weekday is not None or start_section is not None or end_section is not None or slots:
-        q = q.join(CourseTime, CourseTime.course_id == Course.id)
-
-    if weekday is not None:
-        q = q.filter(CourseTime.weekday == weekday)
-
-    if slots:
-        slot_filters = [
-            and_(
-                CourseTime.weekday == w,
-                CourseTime.start_section <= sec,
-                CourseTime.end_section >= sec,
-            )
-            for (w, sec) in slots
-        ]
-        q = q.filter(or_(*slot_filters))
-
-    # 範圍內
-    if start_section is not None and end_section is not None:
-        q = q.filter(
-            and_(
-                CourseTime.start_section >= start_section,
-                CourseTime.end_section <= end_section,
-            )
-        )
-    elif start_section is not None:
-        q = q.filter(CourseTime.start_section >= start_section)
-    elif end_section is not None:
-        q = q.filter(CourseTime.end_section <= end_section)
-
-    if weekday is not None or start_section is not None or end_section is not None or slots:
-        q = q.distinct(Course.id)
-
-    total = q.count()
-
-    rows = (
-        q.order_by(Course.id.asc())
-        .offset((page - 1) * page_size)
-        .limit(page_size)
-        .all()
-    )
+    # 有指定學期、預設排序：直接用記憶體快照，不打 DB
+    if settings.CATALOG_SNAPSHOT_ENABLED and filters.semester and sort == "default":
+        snap = get_snapshot(db, filters.semester)
+        positions = snap.search(filters)
+        total = len(positions) if include_total and not cursor else None
+        if cursor:
+            positions = snap.after(positions, decode_cursor(cursor)["id"])
+            start = 0
+        else:
+            start = (page - 1) * page_size
+        page_pos = positions[start:start + page_size]
+        next_cursor = None
+        if len(positions) > start + page_size:
+            next_cursor = encode_cursor({"id": snap.ids[page_pos[-1]]})
+        return {
+            "page": page, "page_size": page_size, "total": total,
+            "total_estimated": False, "next_cursor": next_cursor,
+            "items": [snap.item(i) for i in page_pos],
+        }
+
+    by_relevance = sort == "relevance" and filters.keyword is not None
+    if by_relevance and cursor:
+        raise HTTPException(status_code=400, detail="cursor 只支援預設排序")
+
+    # 第一段：只查 course_id
+    params = filters.params()
+    total, total_estimated = None, False
+    if cursor:
+        params.update(last_id=decode_cursor(cursor)["id"], offset=0)
+    else:
+        if include_total:
+            total, total_estimated = cached_count(db, filters, count_mode)
+        params["offset"] = (page - 1) * page_size
+    params["limit"] = page_size + 1
+
+    stmt = page_stmt(filters.shape, False, "relevance" if by_relevance else "id", "id" if cursor else None)
+    page_ids = db.execute(stmt, params).scalars().all()
+    next_cursor = None
+    if len(page_ids) > page_size:
+        page_ids = page_ids[:page_size]
+        if not by_relevance:
+            next_cursor = encode_cursor({"id": page_ids[-1]})
+
+    # 第二段：補 teacher / department / times
+    items = build_course_items(db, page_ids)
+
+    return {
+        "page": page, "page_size": page_size, "total": total,
+        "total_estimated": total_estimated, "next_cursor": next_cursor, "items": items,
+    }
+
+@router.get("/facets")
+def course_facets(
+    db: Session = Depends(get_db),
+    filters: CourseFilters = Depends(course_filter_params),
+):
+    """
+    目前篩選條件下，系所 / 課別 / 年級 / 分類 / 星期 / 學分 各選項的課程數
+    """
+    if settings.CATALOG_SNAPSHOT_ENABLED and filters.semester:
+        return snapshot_facets(get_snapshot(db, filters.semester), filters)
+    return query_facets(db, filters)
 
-    items = []
-    for course, teacher_name, dept_id, dept_name, times in rows:
-        items.append({
-            "id": course.id,
-            "name_zh": course.name_zh,
-            "name_en": course.name_en,
-            "semester": course.semester,
-            "grade": course.grade,
-            "required_type": course.required_type,
-            "category": course.category,
-
-            
-            "department_id": dept_id,
-            "department_name": dept_name,
-
-            "teacher_id": course.teacher_id,
-            "teacher_name": teacher_name,
-            "credit": course.credit,
-            "class_group": course.class_group,
-            "group_code": course.group_code,
-            "limit_min": course.limit_min,
-            "limit_max": course.limit_max,
-            "raw_remark": course.raw_remark,
-            "times": times or [],
-        })
-
-    return {"page": page, "page_size": page_size, "total": total, "items": items}
+@router.get("/suggest")
+def suggest_courses(
+    db: Session = Depends(get_db),
+    q: str = Query(..., min_length=1, max_length=50, description="輸入中的關鍵字（課號 / 課名 / 教師）"),
+    semester: Optional[str] = Query(None, description="學期，預設最新學期"),
+    limit: int = Query(10, ge=1, le=20),
+):
+    """
+    關鍵字自動完成：記憶體 n-gram 索引，不打 DB（索引過期時才重建）
+    """
+    if not semester:
+        semesters = get_catalog_meta(db)["data"]["semesters"]
+        if not semesters:
+            return {"semester": None, "items": []}
+        semester = semesters[0]
+    idx = get_suggest_index(db, semester)
+    return {"semester": semester, "items": idx.search(q, limit)}
+
+@router.get("/batch", response_model=List[CourseDetailOut])
+def get_courses_batch(
+    db: Session = Depends(get_db),
+    ids: list[str] = Query(..., description="課號，可重複帶參數或用逗號分隔：ids=A&ids=B 或 ids=A,B"),
+):
+    """
+    一次取多門課的詳細資料（依傳入順序，不存在的略過）
+    """
+    course_ids = [x.strip() for raw in ids for x in raw.split(",") if x.strip()]
+    if len(course_ids) > 100:
+        raise HTTPException(status_code=400, detail="一次最多 100 門課")
+    return get_course_details(db, course_ids)
 
 @router.get("/export")
 def export_courses_excel(
     db: Session = Depends(get_db),
-    
-
-    keyword: Optional[str] = Query(None, description="課程名稱關鍵字（中/英）"),
-    semester: Optional[str] = Query(None, description="學期，例如 1141"),
-    required_type: Optional[str] = Query(None, description="課別，例如 專業必修(系所)"),
-    grade: Optional[int] = Query(None, description="年級"),
-    teacher: Optional[str] = Query(None, description="教師（可用代碼或姓名關鍵字）"),
-    category: Optional[str] = Query(None, description="課程分類（category 欄位）"),
-    department: Optional[str] = Query(None, description="系所（可輸入代碼或名稱關鍵字）"),
-
-    time_slots: list[str] | None = Query(None, description="多選: 1-1,1-2,3-5..."),
-
-    weekday: Optional[int] = Query(None, ge=1, le=7, description="上課星期 1~7"),
-    start_section: Optional[int] = Query(None, ge=1, le=15, description="起始節次"),
-    end_section: Optional[int] = Query(None, ge=1, le=15, description="結束節次"),
+    filters: CourseFilters = Depends(course_filter_params),
+    format: ExportFormat = Query("xlsx", description="xlsx / csv / ndjson / parquet"),
 ):
     """
-    匯出「課程查詢結果」成 Excel（.xlsx）
+    匯出「課程查詢結果」（預設 Excel .xlsx）
     """
-
-    q = (
-        db.query(
-            Course,
-            Teacher.name.label("teacher_name"),
-            Department.name.label("department_name"),
-        )
-        .outerjoin(Teacher, Teacher.id == Course.teacher_id)
-        .outerjoin(Department, Department.id == Course.department_id)
-    )
-
-    # 一般篩選
-    if keyword:
-        k = f"%{keyword.strip()}%"
-        q = q.filter(or_(Course.name_zh.ilike(k), Course.name_en.ilike(k)))
-
-    if semester:
-        q = q.filter(Course.semester == semester)
-
-    if required_type:
-        q = q.filter(Course.required_type == required_type)
-
-    if grade is not None:
-        q = q.filter(Course.grade == grade)
-
-    if category:
-        q = q.filter(Course.category == category)
-
-    if department:
-        d = department.strip()
-        q = q.filter(or_(Course.department_id == d, Department.name.ilike(f"%{d}%")))
-
-    if teacher:
-        t = teacher.strip()
-        q = q.filter(or_(Course.teacher_id == t, Teacher.name.ilike(f"%{t}%")))
-
-    # 時間篩選
-    slots = parse_time_slots(time_slots)
-
-    if weekday is not None or start_section is not None or end_section is not None or slots:
-        q = q.join(CourseTime, CourseTime.course_id == Course.id)
-
-    if weekday is not None:
-        q = q.filter(CourseTime.weekday == weekday)
-
-    if slots:
-        slot_filters = [
-            and_(
-                CourseTime.weekday == w,
-                CourseTime.start_section <= sec,
-                CourseTime.end_section >= sec,
-            )
-            for (w, sec) in slots
-        ]
-        q = q.filter(or_(*slot_filters))
-
-    if start_section is not None and end_section is not None:
-        q = q.filter(and_(CourseTime.start_section >= start_section, CourseTime.end_section <= end_section))
-    elif start_section is not None:
-        q = q.filter(CourseTime.start_section >= start_section)
-    elif end_section is not None:
-        q = q.filter(CourseTime.end_section <= end_section)
-
-    if weekday is not None or start_section is not None or end_section is not None or slots:
-        q = q.distinct(Course.id)
-
-    q = q.order_by(Course.id.asc())
-    results = q.all()
-    if not results:
+    params = {**filters.params(), "offset": 0, "limit": 1}
+    if db.execute(page_stmt(filters.shape), params).first() is None:
         raise HTTPException(
             status_code=404,
             detail="No courses found for the given filters."
         )
-    #times map（避免 N+1)
-    course_ids = [c.id for (c, _tname, _dname) in results]
-    times_map: dict[str, list[CourseTime]] = {}
-    if course_ids:
-        times = (
-            db.query(CourseTime)
-            .filter(CourseTime.course_id.in_(course_ids))
-            .order_by(CourseTime.course_id, CourseTime.weekday, CourseTime.start_section)
-            .all()
-        )
-        for t in times:
-            times_map.setdefault(t.course_id, []).append(t)
-
-    def pick_first_time(course_id: str):
-        """export 對齊 import：只輸出一筆 上課星期/上課節次/上課地點（若同課多時段，取第一筆）"""
-        arr = times_map.get(course_id, [])
-        if not arr:
-            return None, None, None
-        t = arr[0]
-        w = t.weekday
-        # 上課節次：單節就輸出 "3"，多節就輸出 "3-5"
-        if t.start_section == t.end_section:
-            sec = str(t.start_section)
-        else:
-            sec = f"{t.start_section}-{t.end_section}"
-        return w, sec, t.classroom
-
-    # ===== 匯出欄位：對齊 import 讀取的 header =====
-    # 系所代碼、主開課教師代碼(舊碼)/授課教師代碼(舊碼)、主開課教師姓名/授課教師姓名、
-    # 科目代碼(新碼全碼)、科目中文名稱、科目英文名稱、年級、上課班組、科目組別、學分數、課別名稱、課別代碼、
-    # 上課人數、課程中文摘要、課程英文摘要、課表備註、學期、上課星期、上課節次、上課地點
-    rows_for_excel = []
-    for course, teacher_name, dept_name in results:
-        w, sec, room = pick_first_time(course.id)
-
-        rows_for_excel.append(OrderedDict([
-            ("系所代碼", course.department_id),
-            ("主開課教師代碼(舊碼)", course.teacher_id),
-            ("主開課教師姓名", teacher_name or ""),
-            ("授課教師代碼(舊碼)", course.teacher_id),
-            ("授課教師姓名", teacher_name or ""),
-
-            ("科目代碼(新碼全碼)", course.id),
-            ("科目中文名稱", course.name_zh or ""),
-            ("科目英文名稱", course.name_en or ""),
-
-            ("年級", course.grade),
-            ("上課班組", course.class_group or ""),
-            ("科目組別", course.group_code or ""),
-
-            ("學分數", course.credit),
-            ("課別名稱", course.required_type or ""),
-            ("課別代碼", course.category or ""),
-            ("上課人數", course.limit_max),
-
-            ("課程中文摘要", course.chinese_summary or ""),
-            ("課程英文摘要", course.english_summary or ""),
-            ("課表備註", course.raw_remark or ""),
-            ("學期", course.semester or ""),
-
-            ("上課星期", w),
-            ("上課節次", sec),
-            ("上課地點", room or ""),
-        ]))
-
-    xlsx_bytes = courses_to_xlsx_bytes(rows_for_excel, sheet_name="Courses")
-    filename = make_filename("courses")  
 
+    if format in ("csv", "ndjson"):
+        # 邊查邊吐，generator 自己開 session
+        body = iter_export_stream(format, iter_export_rows(filters))
+    else:
+        # xlsx / parquet：單次寫完到暫存檔，再分段串流給前端
+        try:
+            export_file = write_export_file(format, iter_export_rows(filters, db))
+        except ImportError:
+            raise HTTPException(status_code=400, detail="Parquet export requires pyarrow")
+        body = iter_file(export_file)
+
+    filename = make_filename("courses", format)
     return StreamingResponse(
-        iter([xlsx_bytes]),
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        body,
+        media_type=MEDIA_TYPES[format],
         headers={"Content-Disposition": f'attachment; filename="{filename}"'},
     )
 
-#給前端下拉選單用
+def _export_job_out(job) -> dict:
+    out = job.to_dict()
+    out["status_url"] = f"/courses/export/jobs/{job.id}"
+    if job.status == "done":
+        out["download_url"] = f"/courses/export/jobs/{job.id}/file"
+        out["size"] = job.result["size"]
+    return out
+
+
+@router.post("/export/jobs", status_code=202)
+def create_export_job(
+    user=Depends(get_token_user),
+    filters: CourseFilters = Depends(course_filter_params),
+    format: ExportFormat = Query("xlsx", description="xlsx / csv / ndjson / parquet"),
+):
+    """
+    背景產生匯出檔；同樣條件（同一個 catalog 版本）已經有的檔案直接重用
+    需要登入；未完成的工作太多時 503
+    """
+    job, reused = submit_export(filters, format)
+    return {**_export_job_out(job), "reused": reused}
+
+
+@router.get("/export/jobs/{job_id}")
+def get_export_job(job_id: str):
+    job = export_runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return _export_job_out(job)
+
+
+@router.get("/export/jobs/{job_id}/file")
+def download_export_job(job_id: str):
+    job = export_runner.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    if job.status != "done":
+        raise HTTPException(status_code=409, detail=f"Export job is {job.status}")
+    fmt = job.result["format"]
+    return FileResponse(
+        job.result["path"],
+        media_type=MEDIA_TYPES[fmt],
+        filename=make_filename("courses", fmt),
+    )
+
+#給前端下拉選單用（五個清單一起，前端可帶 If-None-Match）
+@router.get("/meta")
+def catalog_meta(
+    db: Session = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
+):
+    meta = get_catalog_meta(db)
+    headers = {"ETag": meta["etag"], "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, meta["etag"]):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse({"version": meta["version"], **meta["data"]}, headers=headers)
+
+
 @router.get("/meta/teachers")
 def list_teachers(db: Session = Depends(get_db)):
-    rows = db.query(Teacher.id, Teacher.name).order_by(Teacher.id.asc()).all()
-    return [{"id": r[0], "name": r[1]} for r in rows]
+    return get_catalog_meta(db)["data"]["teachers"]
 
 
 @router.get("/meta/departments")
 def list_departments(db: Session = Depends(get_db)):
-    rows = db.query(Department.id, Department.name).order_by(Department.id.asc()).all()
-    return [{"id": r[0], "name": r[1]} for r in rows]
+    return get_catalog_meta(db)["data"]["departments"]
 
 
 @router.get("/meta/semesters")
 def list_semesters(db: Session = Depends(get_db)):
-    rows = db.query(Course.semester).distinct().order_by(Course.semester.desc()).all()
-    return [r[0] for r in rows if r[0]]
+    return get_catalog_meta(db)["data"]["semesters"]
 
 
 @router.get("/meta/required-types")
 def list_required_types(db: Session = Depends(get_db)):
-    rows = db.query(Course.required_type).distinct().order_by(Course.required_type.asc()).all()
-    return [r[0] for r in rows if r[0]]
+    return get_catalog_meta(db)["data"]["required_types"]
 
 
 @router.get("/meta/categories")
 def list_categories(db: Session = Depends(get_db)):
-    rows = db.query(Course.category).distinct().order_by(Course.category.asc()).all()
-    return [r[0] for r in rows if r[0]]
+    return get_catalog_meta(db)["data"]["categories"]
 
 
+# 放最後：避免 /{course_id} 吃掉 /public、/meta 等固定路徑
+@router.get("/{course_id}", response_model=CourseDetailOut)
+def get_course_detail(course_id: str, db: Session = Depends(get_db)):
+    items = get_course_details(db, [course_id])
+    if not items:
+        raise HTTPException(status_code=404, detail="Course not found")
+    return items[0]
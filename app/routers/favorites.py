@@ -5,17 +5,13 @@ from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.favorite import Favorite
 from app.models.course import Course
-from app.utils.auth import get_current_user
+from app.utils.auth import get_current_user, get_token_user
 from app.models.course_time import CourseTime
 from app.schemas.favorite import FavoriteCourseOut
 
-from app.models.teacher import Teacher
-from app.models.department import Department
+from app.utils.course_rows import build_course_items
 
-from sqlalchemy import and_, func, cast
-from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy.sql import exists, tuple_
-from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy import and_
 
 import logging
 logger = logging.getLogger("app.admin")
@@ -83,83 +79,29 @@ def add_favorite(course_id: str, db: Session = Depends(get_db), user=Depends(get
 @router.get("")
 def list_my_favorites(
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    user=Depends(get_token_user),
     page: int = 1,
     page_size: int = 200,
 ):
-    # times 聚合
-    times_sq = (
-        db.query(
-            CourseTime.course_id.label("cid"),
-            func.coalesce(
-                func.jsonb_agg(
-                    aggregate_order_by(
-                        func.jsonb_build_object(
-                            "weekday", CourseTime.weekday,
-                            "start_section", CourseTime.start_section,
-                            "end_section", CourseTime.end_section,
-                            "classroom", CourseTime.classroom,
-                        ),
-                        tuple_(CourseTime.weekday, CourseTime.start_section),
-                    )
-                ),
-                cast("[]", JSONB),
-            ).label("times"),
-        )
-        .group_by(CourseTime.course_id)
-        .subquery()
-    )
-
-    # 只列出「我的收藏」
+    # 第一段：只查「我的收藏」這一頁的 course_id
     q = (
-        db.query(
-            Course,
-            Teacher.name.label("teacher_name"),
-            Department.id.label("department_id"),
-            Department.name.label("department_name"),
-            times_sq.c.times.label("times"),
-        )
+        db.query(Course.id)
         .join(Favorite, and_(Favorite.course_id == Course.id, Favorite.user_id == user.id))
-        .outerjoin(Teacher, Teacher.id == Course.teacher_id)
-        .outerjoin(Department, Department.id == Course.department_id)
-        .outerjoin(times_sq, times_sq.c.cid == Course.id)
     )
 
     total = q.count()
 
-    rows = (
+    page_rows = (
         q.order_by(Course.semester.desc().nullslast(), Course.id.asc())
         .offset((page - 1) * page_size)
         .limit(page_size)
         .all()
     )
 
-    items = []
-    for course, teacher_name, dept_id, dept_name, times in rows:
-        items.append({
-            "id": course.id,
-            "name_zh": course.name_zh,
-            "name_en": course.name_en,
-            "semester": course.semester,
-            "grade": course.grade,
-            "required_type": course.required_type,
-            "category": course.category,
-
-            "department_id": dept_id,
-            "department_name": dept_name,
-
-            "teacher_id": course.teacher_id,
-            "teacher_name": teacher_name,
-            "credit": course.credit,
-            "class_group": course.class_group,
-            "group_code": course.group_code,
-            "limit_min": course.limit_min,
-            "limit_max": course.limit_max,
-            "raw_remark": course.raw_remark,
-
-            "is_favorite": True,     
-            "times": times or [],
-        })
+    # 第二段：補 teacher / department / times
+    course_ids = [r[0] for r in page_rows]
+    extras = {cid: {"is_favorite": True} for cid in course_ids}
+    items = build_course_items(db, course_ids, extras)
 
     return {"page": page, "page_size": page_size, "total": total, "items": items}
 
@@ -3,7 +3,7 @@ from fastapi import APIRouter, Depends, Query, HTTPException
 from sqlalchemy.orm import Session
 
 from app.database import get_db
-from app.utils.auth import get_current_user
+from app.utils.auth import get_token_user
 
 from app.models.student_course_selection import StudentCourseSelection
 from app.models.course import Course
@@ -18,7 +18,7 @@ router = APIRouter(prefix="/students/me", tags=["Student - Timetable"])
 @router.get("/timetable", response_model=list[TimetableCourseOut])
 def get_my_timetable(
     db: Session = Depends(get_db),
-    user=Depends(get_current_user),
+    user=Depends(get_token_user),
     semester: str = Query(...),
     status: str = Query("planned"),
 ):
@@ -1,16 +1,90 @@
-
+from dataclasses import dataclass
 from datetime import datetime, timedelta
+from typing import Optional
 from jose import jwt, JWTError
 from fastapi import HTTPException, Depends
 from fastapi.security import OAuth2PasswordBearer
 
 from app.config import settings
 from app.database import get_db
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from app.models.user import User
+from app.utils.cache import TTLCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
+# 已驗證使用者快取：key = JWT sub（username），value = 已 expunge 的 User（detached）
+# 命中時 db.merge(load=False) 放回這個 request 的 session，不發 SQL
+# 後台改角色 / 帳號 / 密碼、刪除使用者時呼叫 invalidate_user；多個 worker 之間靠 TTL 限制舊的程度
+_user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL)
+
+# token 撤銷檢查：key = user id，value = (token_version,)；使用者不存在時是 (None,)
+_token_versions = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.TOKEN_VERSION_CACHE_TTL)
+
+
+@dataclass(frozen=True)
+class TokenUser:
+    """
+    JWT claims 組成的使用者（唯讀路徑用，不查 users 表）
+    """
+    id: int
+    username: str
+    role: Optional[str]
+    token_version: int
+
+
+def invalidate_user(*usernames, user_id: Optional[int] = None) -> None:
+    for name in usernames:
+        if name:
+            _user_cache.pop(name)
+    if user_id is not None:
+        _token_versions.pop(user_id)
+
+
+def revoke_tokens(user: User) -> None:
+    """
+    token_version +1，已發出的 token 全部失效（由呼叫端 commit，commit 後再 invalidate_user）
+    """
+    user.token_version = (user.token_version or 0) + 1
+
+
+def user_cache_stats() -> dict:
+    return {"users": _user_cache.stats(), "token_versions": _token_versions.stats()}
+
+
+def _load_user(db: Session, username: str):
+    cached = _user_cache.get(username)
+    if cached is not None:
+        return db.merge(cached, load=False)
+
+    user = db.query(User).filter(User.username == username).first()
+    if user is None:
+        return None
+    # 快取放一份 detached 的；回傳的是同一筆資料在這個 session 裡的 instance
+    db.expunge(user)
+    _user_cache.set(username, user)
+    return db.merge(user, load=False)
+
+
+def current_token_version(db: Session, user_id: int, refresh: bool = False) -> Optional[int]:
+    """
+    refresh=True：不看快取，重新讀 DB（其他 worker 改過 token_version 時，本機快取可能是舊的）
+    """
+    hit = None if refresh else _token_versions.get(user_id)
+    if hit is not None:
+        return hit[0]
+    v = db.execute(select(User.token_version).where(User.id == user_id)).scalar_one_or_none()
+    _token_versions.set(user_id, (v,))
+    return v
+
+
+def token_claims(user: User) -> dict:
+    """
+    登入時放進 JWT 的 claims：唯讀路徑靠 uid / role 就不用查 users，tv 用來撤銷
+    """
+    return {"sub": user.username, "uid": user.id, "role": user.role, "tv": user.token_version or 0}
+
 def create_access_token(data: dict, expires_minutes=60):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=expires_minutes)
@@ -18,24 +92,69 @@ def create_access_token(data: dict, expires_minutes=60):
     token = jwt.encode(to_encode, settings.JWT_SECRET, algorithm=settings.JWT_ALGORITHM)
     return token
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def _decode(token: str) -> dict:
     try:
         payload = jwt.decode(token, settings.JWT_SECRET, algorithms=[settings.JWT_ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=403, detail="Invalid token")
+    except JWTError:
+        raise HTTPException(status_code=403, detail="Invalid authentication token")
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=403, detail="Invalid token")
+    return payload
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    payload = _decode(token)
+
+    user = _load_user(db, payload["sub"])
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+
+    # 舊 token 沒有 tv，不檢查
+    tv = payload.get("tv")
+    if tv is None:
+        return user
+
+    # 撤銷檢查走 current_token_version（不一致會重讀 DB），不看快取裡 User 的 token_version：
+    # 其他 worker 重設密碼 / 改角色後，本機快取的 User 可能還是舊的
+    current = current_token_version(db, user.id)
+    if current != tv:
+        current = current_token_version(db, user.id, refresh=True)
+    if current != tv:
+        raise HTTPException(status_code=401, detail="Token revoked")
 
-        user = db.query(User).filter(User.username == username).first()
+    if (user.token_version or 0) != current:
+        # 快取的 User 比 DB 舊（角色等欄位可能也變了），丟掉重讀
+        invalidate_user(payload["sub"])
+        db.expunge(user)
+        user = _load_user(db, payload["sub"])
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
 
-        return user
+    return user
 
-    except JWTError:
-        raise HTTPException(status_code=403, detail="Invalid authentication token")
+#唯讀路徑用：信任 JWT 的 uid / role，只用快取過的 token_version 檢查撤銷
+def get_token_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> TokenUser:
+    payload = _decode(token)
+    uid, tv = payload.get("uid"), payload.get("tv")
+
+    if uid is None or tv is None:
+        # 舊 token（只有 sub）：照舊查一次 users
+        user = get_current_user(token, db)
+        return TokenUser(user.id, user.username, user.role, user.token_version or 0)
+
+    current = current_token_version(db, uid)
+    if current != tv:
+        # 不一致時先重讀 DB 再判斷：token_version 只會變大，claim 比快取新代表快取舊了
+        # （另一個 worker 重設密碼 / 改角色後新登入的 token）；舊 token 在快取刷新後也會被擋
+        current = current_token_version(db, uid, refresh=True)
+    if current is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    if current != tv:
+        raise HTTPException(status_code=401, detail="Token revoked")
+
+    return TokenUser(uid, payload["sub"], payload.get("role"), tv)
 
 #管理者驗證
 def require_admin(user=Depends(get_current_user)):
     if getattr(user, "role", None) != "admin":
         raise HTTPException(status_code=403, detail="Admin only")
-    return user
\ No newline at end of file
+    return user
@@ -0,0 +1,66 @@
+# app/utils/catalog_meta.py
+"""
+下拉選單用的 metadata（教師 / 系所 / 學期 / 課別 / 分類）
+
+- 五個清單一起查、一起快取，key 是 catalog 版本號；admin 改課程 / 匯入（會新增教師、系所）後版本號變了就重查
+- etag 用內容的 hash，多個 worker 之間內容一樣 etag 就一樣
+"""
+import hashlib
+import json
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.course import Course
+from app.models.teacher import Teacher
+from app.models.department import Department
+from app.utils.cache import TTLCache
+from app.utils.catalog_version import get_catalog_version
+
+_meta_cache = TTLCache(maxsize=4, ttl=settings.CATALOG_META_TTL)
+
+
+def _distinct(db: Session, col, desc: bool = False) -> list:
+    rows = db.query(col).distinct().order_by(col.desc() if desc else col.asc()).all()
+    return [r[0] for r in rows if r[0]]
+
+
+def _load(db: Session) -> dict:
+    teachers = db.query(Teacher.id, Teacher.name).order_by(Teacher.id.asc()).all()
+    departments = db.query(Department.id, Department.name).order_by(Department.id.asc()).all()
+    return {
+        "teachers": [{"id": r[0], "name": r[1]} for r in teachers],
+        "departments": [{"id": r[0], "name": r[1]} for r in departments],
+        "semesters": _distinct(db, Course.semester, desc=True),
+        "required_types": _distinct(db, Course.required_type),
+        "categories": _distinct(db, Course.category),
+    }
+
+
+def get_catalog_meta(db: Session) -> dict:
+    """
+    回傳 {"version", "etag", "data"}
+    """
+    version = get_catalog_version()
+    hit = _meta_cache.get(version)
+    if hit is not None:
+        return hit
+
+    data = _load(db)
+    body = json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    meta = {
+        "version": version,
+        "etag": '"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"',
+        "data": data,
+    }
+    _meta_cache.set(version, meta)
+    return meta
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return any(t.removeprefix("W/") == etag for t in tags)
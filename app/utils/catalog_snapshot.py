@@ -0,0 +1,333 @@
+# app/utils/catalog_snapshot.py
+"""
+/courses/public 用的 process 內課程快照（每個學期一份）
+
+- 欄位用 list / array 存（依 course id 排序），索引是 值 -> 位置陣列
+- 查詢、分頁、count 全部在記憶體完成，不打 DB
+- catalog 版本號變了（admin 改課程 / 匯入）或超過 TTL 就重建；
+  重建時先在旁邊建好新物件再一次換掉，查詢中的請求不會看到半成品
+"""
+import threading
+import time
+import logging
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.course import Course
+from app.models.teacher import Teacher
+from app.models.department import Department
+from app.models.course_time import CourseTime
+from app.utils.catalog_meta import get_catalog_meta
+from app.utils.catalog_version import get_catalog_version
+from app.utils.course_filters import CourseFilters
+from app.utils.timeslots import SLOT_SECTIONS, ranges_to_mask, slots_to_mask
+
+logger = logging.getLogger("app.catalog")
+
+_GRADE_NONE = -1
+
+
+def _index(values: list) -> Dict[object, array]:
+    idx: Dict[object, array] = {}
+    for pos, v in enumerate(values):
+        if v is None:
+            continue
+        idx.setdefault(v, array("I")).append(pos)
+    return idx
+
+
+class CatalogSnapshot:
+    def __init__(self, semester: str, version: int, course_rows: list, time_rows: list):
+        self.semester = semester
+        self.version = version
+        self.built_at = time.monotonic()
+
+        course_rows = sorted(course_rows, key=lambda r: r[0].id)
+        n = len(course_rows)
+
+        self.ids: List[str] = []
+        self.name_zh: List[Optional[str]] = []
+        self.name_en: List[Optional[str]] = []
+        self.grade = array("i")
+        self.required_type: List[Optional[str]] = []
+        self.category: List[Optional[str]] = []
+        self.department_id: List[Optional[str]] = []     # 來自 departments（join 不到就是 None）
+        self.department_name: List[Optional[str]] = []
+        self.teacher_id: List[Optional[str]] = []
+        self.teacher_name: List[Optional[str]] = []
+        self.credit = array("i")
+        self.class_group: List[Optional[str]] = []
+        self.group_code: List[Optional[str]] = []
+        self.limit_min: List[Optional[int]] = []
+        self.limit_max: List[Optional[int]] = []
+        self.raw_remark: List[Optional[str]] = []
+
+        # 關鍵字比對用（小寫）
+        self._name_zh_lc: List[str] = []
+        self._name_en_lc: List[str] = []
+
+        for course, teacher_name, dept_id, dept_name in course_rows:
+            self.ids.append(course.id)
+            self.name_zh.append(course.name_zh)
+            self.name_en.append(course.name_en)
+            self.grade.append(course.grade if course.grade is not None else _GRADE_NONE)
+            self.required_type.append(course.required_type)
+            self.category.append(course.category)
+            self.department_id.append(dept_id)
+            self.department_name.append(dept_name)
+            self.teacher_id.append(course.teacher_id)
+            self.teacher_name.append(teacher_name)
+            self.credit.append(course.credit or 0)
+            self.class_group.append(course.class_group)
+            self.group_code.append(course.group_code)
+            self.limit_min.append(course.limit_min)
+            self.limit_max.append(course.limit_max)
+            self.raw_remark.append(course.raw_remark)
+            self._name_zh_lc.append((course.name_zh or "").lower())
+            self._name_en_lc.append((course.name_en or "").lower())
+
+        # times：每門課一個 tuple((weekday, start, end, classroom), ...)，已依 (weekday, start) 排序
+        pos_of = {cid: i for i, cid in enumerate(self.ids)}
+        times: List[list] = [[] for _ in range(n)]
+        for cid, w, s, e, room in time_rows:
+            i = pos_of.get(cid)
+            if i is not None:
+                times[i].append((w, s, e, room))
+        self.times: List[tuple] = [
+            tuple(sorted(ts, key=lambda t: (t[0] or 0, t[1] or 0))) for ts in times
+        ]
+        # 時段格子 bitmask（和 courses.time_mask 同一套編碼）
+        self.time_mask: List[int] = [ranges_to_mask((w, s, e) for w, s, e, _ in ts) for ts in self.times]
+
+        # 索引
+        self.idx_required_type = _index(self.required_type)
+        self.idx_category = _index(self.category)
+        self.idx_grade = _index([c.grade for c, *_ in course_rows])
+        self.idx_department = _index([c.department_id for c, *_ in course_rows])
+        self.idx_teacher = _index(self.teacher_id)
+
+        # 名稱 -> 代碼（名稱關鍵字先比對這張小表，再 union 對應的位置）
+        self._dept_names = {d: (nm or "").lower() for d, nm in zip(self.department_id, self.department_name) if d}
+        self._teacher_names = {t: (nm or "").lower() for t, nm in zip(self.teacher_id, self.teacher_name) if t}
+
+    def __len__(self):
+        return len(self.ids)
+
+    # ---------- 篩選 ----------
+    def _code_or_name(self, idx: Dict[object, array], names: Dict[str, str], text: str) -> set:
+        t = text.strip()
+        t_lc = t.lower()
+        out = set(idx.get(t, ()))
+        for code, nm in names.items():
+            if t_lc in nm:
+                out.update(idx.get(code, ()))
+        return out
+
+    @staticmethod
+    def _time_match(times: tuple, weekday, start_section, end_section, slot_mask: int = 0) -> bool:
+        # 與 course_filters 的 EXISTS 條件相同：同一筆時段要同時符合全部條件
+        # slot_mask（slot_mode=any 時才給）：這筆時段也要佔到勾選的格子
+        for w, s, e, _room in times:
+            if weekday is not None and w != weekday:
+                continue
+            if start_section is not None and (s is None or s < start_section):
+                continue
+            if end_section is not None and (e is None or e > end_section):
+                continue
+            if slot_mask and not (
+                s is not None and 1 <= s <= SLOT_SECTIONS and ranges_to_mask([(w, s, e)]) & slot_mask
+            ):
+                continue
+            return True
+        return False
+
+    def _slot_match(self, i: int, slot_mask: int, slot_mode: str) -> bool:
+        # 與 course_filters 的 time_mask 條件相同
+        m = self.time_mask[i]
+        if slot_mode == "within":
+            return m != 0 and m & ~slot_mask == 0
+        return m & slot_mask != 0
+
+    def search(self, f: CourseFilters) -> List[int]:
+        """
+        回傳符合條件的位置（依 course id 遞增）；semester 由快照本身決定
+        """
+        sets = []
+        if f.required_type is not None:
+            sets.append(set(self.idx_required_type.get(f.required_type, ())))
+        if f.category is not None:
+            sets.append(set(self.idx_category.get(f.category, ())))
+        if f.grade is not None:
+            sets.append(set(self.idx_grade.get(f.grade, ())))
+        if f.department is not None:
+            sets.append(self._code_or_name(self.idx_department, self._dept_names, f.department))
+        if f.teacher is not None:
+            sets.append(self._code_or_name(self.idx_teacher, self._teacher_names, f.teacher))
+
+        if sets:
+            sets.sort(key=len)
+            candidates = sets[0].intersection(*sets[1:])
+            positions = sorted(candidates)
+        else:
+            positions = range(len(self.ids))
+
+        k = f.keyword.lower() if f.keyword is not None else None
+        has_time = f.weekday is not None or f.start_section is not None or f.end_section is not None
+        slot_mask = slots_to_mask(list(f.slots)) if f.slots else 0
+        row_mask = slot_mask if f.slot_mode == "any" else 0
+        if not k and not has_time and not f.slots:
+            return list(positions)
+
+        out = []
+        for i in positions:
+            if k and k not in self._name_zh_lc[i] and k not in self._name_en_lc[i]:
+                continue
+            if f.slots and not self._slot_match(i, slot_mask, f.slot_mode):
+                continue
+            if has_time and not self._time_match(self.times[i], f.weekday, f.start_section, f.end_section, row_mask):
+                continue
+            out.append(i)
+        return out
+
+    def after(self, positions: List[int], last_id: str) -> List[int]:
+        """
+        cursor：只留 id > last_id 的位置
+        """
+        start = bisect_right(self.ids, last_id)
+        return [i for i in positions if i >= start]
+
+    def facets(self, positions: List[int]) -> Dict[str, Counter]:
+        """
+        /courses/facets：掃一次符合的位置，算各欄位的課程數（None 不計）
+        """
+        out = {name: Counter() for name in ("department", "required_type", "grade", "category", "weekday", "credit")}
+        for i in positions:
+            if self.department_id[i] is not None:
+                out["department"][(self.department_id[i], self.department_name[i])] += 1
+            if self.required_type[i] is not None:
+                out["required_type"][self.required_type[i]] += 1
+            if self.grade[i] != _GRADE_NONE:
+                out["grade"][self.grade[i]] += 1
+            if self.category[i] is not None:
+                out["category"][self.category[i]] += 1
+            for w in {t[0] for t in self.times[i] if t[0] is not None}:
+                out["weekday"][w] += 1
+            out["credit"][self.credit[i]] += 1
+        return out
+
+    # ---------- 輸出 ----------
+    def item(self, i: int) -> dict:
+        return {
+            "id": self.ids[i],
+            "name_zh": self.name_zh[i],
+            "name_en": self.name_en[i],
+            "semester": self.semester,
+            "grade": None if self.grade[i] == _GRADE_NONE else self.grade[i],
+            "required_type": self.required_type[i],
+            "category": self.category[i],
+
+            "department_id": self.department_id[i],
+            "department_name": self.department_name[i],
+
+            "teacher_id": self.teacher_id[i],
+            "teacher_name": self.teacher_name[i],
+            "credit": self.credit[i],
+            "class_group": self.class_group[i],
+            "group_code": self.group_code[i],
+            "limit_min": self.limit_min[i],
+            "limit_max": self.limit_max[i],
+            "raw_remark": self.raw_remark[i],
+            "times": [
+                {"weekday": w, "start_section": s, "end_section": e, "classroom": room}
+                for w, s, e, room in self.times[i]
+            ],
+        }
+
+
+_snapshots: Dict[str, CatalogSnapshot] = {}
+_build_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _load(db: Session, semester: str, version: int) -> CatalogSnapshot:
+    started = time.perf_counter()
+    course_rows = (
+        db.query(
+            Course,
+            Teacher.name.label("teacher_name"),
+            Department.id.label("department_id"),
+            Department.name.label("department_name"),
+        )
+        .outerjoin(Teacher, Teacher.id == Course.teacher_id)
+        .outerjoin(Department, Department.id == Course.department_id)
+        .filter(Course.semester == semester)
+        .all()
+    )
+    time_rows = (
+        db.query(
+            CourseTime.course_id, CourseTime.weekday,
+            CourseTime.start_section, CourseTime.end_section, CourseTime.classroom,
+        )
+        .join(Course, Course.id == CourseTime.course_id)
+        .filter(Course.semester == semester)
+        .all()
+    )
+    snap = CatalogSnapshot(semester, version, course_rows, time_rows)
+    logger.info(
+        "catalog snapshot %s built: %d courses (v%s, %dms)",
+        semester, len(snap), version, int((time.perf_counter() - started) * 1000),
+    )
+    return snap
+
+
+def _is_fresh(snap: Optional[CatalogSnapshot], version: int) -> bool:
+    return (
+        snap is not None
+        and snap.version == version
+        and time.monotonic() - snap.built_at < settings.CATALOG_SNAPSHOT_TTL
+    )
+
+
+def semester_exists(db: Session, semester: str) -> bool:
+    if semester in get_catalog_meta(db)["data"]["semesters"]:
+        return True
+    # meta 快取可能還沒看到其他 worker 剛匯入的學期
+    return db.query(Course.id).filter(Course.semester == semester).first() is not None
+
+
+def get_snapshot(db: Session, semester: str) -> CatalogSnapshot:
+    """
+    取得某學期的快照；過期就重建（同一學期同時只會有一個 thread 在建，
+    其他請求若已有舊快照就先用舊的）
+    - 不存在的學期回空快照、不留下來（semester 是查詢參數，不能讓任意值把快取撐大）
+    """
+    version = get_catalog_version()
+    snap = _snapshots.get(semester)
+    if _is_fresh(snap, version):
+        return snap
+    if snap is None and not semester_exists(db, semester):
+        return CatalogSnapshot(semester, version, [], [])
+
+    with _locks_guard:
+        lock = _build_locks.setdefault(semester, threading.Lock())
+
+    if snap is not None and not lock.acquire(blocking=False):
+        return snap
+    if snap is None:
+        lock.acquire()
+    try:
+        # 可能在等鎖的時候別人已經建好了
+        version = get_catalog_version()
+        snap = _snapshots.get(semester)
+        if _is_fresh(snap, version):
+            return snap
+        snap = _load(db, semester, version)
+        _snapshots[semester] = snap
+        return snap
+    finally:
+        lock.release()
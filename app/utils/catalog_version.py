@@ -0,0 +1,22 @@
+import threading
+import logging
+
+logger = logging.getLogger("app.catalog")
+
+# 課程目錄（courses / course_time / teachers / departments）的版本號
+# admin 新增、修改、刪除、匯入後 +1；各種快取把版本號放進 key，版本一變舊資料自然失效
+_version = 0
+_lock = threading.Lock()
+
+
+def get_catalog_version() -> int:
+    return _version
+
+
+def bump_catalog_version(reason: str = "") -> int:
+    global _version
+    with _lock:
+        _version += 1
+        v = _version
+    logger.info("catalog version -> %s (%s)", v, reason)
+    return v
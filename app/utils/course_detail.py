@@ -0,0 +1,111 @@
+# app/utils/course_detail.py
+"""
+/courses/{id}、/courses/batch：依 id 載入課程詳細資料
+
+- 課程 / 教師 / 系所 / 時段：依 (catalog 版本, course_id) 快取，admin 改課程後版本號變了就重查
+- 按讚數 / 留言數是使用者操作就會變的，不快取，每次用 GROUP BY 一次查這批 id
+- 不論幾門課，最多 4 個 query
+"""
+from typing import Dict, List
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.comment import Comment
+from app.models.course_like import CourseLike
+from app.utils.cache import TTLCache
+from app.utils.catalog_version import get_catalog_version
+from app.utils.course_rows import load_course_rows, load_course_times
+
+_detail_cache = TTLCache(maxsize=settings.COURSE_DETAIL_CACHE_SIZE, ttl=settings.COURSE_DETAIL_CACHE_TTL)
+
+
+def _load_catalog_parts(db: Session, course_ids: List[str]) -> Dict[str, dict]:
+    rows = load_course_rows(db, course_ids)
+    times_map = load_course_times(db, list(rows))
+
+    out = {}
+    for cid, (course, teacher_name, dept_id, dept_name) in rows.items():
+        out[cid] = {
+            "id": course.id,
+            "name_zh": course.name_zh,
+            "name_en": course.name_en,
+            "semester": course.semester,
+            "grade": course.grade,
+            "class_group": course.class_group,
+            "group_code": course.group_code,
+            "credit": course.credit,
+            "required_type": course.required_type,
+            "category": course.category,
+            "limit_min": course.limit_min,
+            "limit_max": course.limit_max,
+            "chinese_summary": course.chinese_summary,
+            "english_summary": course.english_summary,
+            "raw_remark": course.raw_remark,
+
+            "department_id": dept_id,
+            "department_name": dept_name,
+            "teacher_id": course.teacher_id,
+            "teacher_name": teacher_name,
+
+            "times": [
+                {
+                    "id": t.id,
+                    "weekday": t.weekday,
+                    "start_section": t.start_section,
+                    "end_section": t.end_section,
+                    "classroom": t.classroom,
+                }
+                for t in times_map.get(cid, [])
+            ],
+        }
+    return out
+
+
+def get_course_details(db: Session, course_ids: List[str]) -> List[dict]:
+    """
+    依傳入順序回傳（重複的 id 只算一次，不存在的 id 略過）
+    """
+    course_ids = list(dict.fromkeys(course_ids))
+    version = get_catalog_version()
+
+    parts: Dict[str, dict] = {}
+    misses = []
+    for cid in course_ids:
+        hit = _detail_cache.get((version, cid))
+        if hit is None:
+            misses.append(cid)
+        else:
+            parts[cid] = hit
+
+    if misses:
+        for cid, part in _load_catalog_parts(db, misses).items():
+            _detail_cache.set((version, cid), part)
+            parts[cid] = part
+
+    found = [cid for cid in course_ids if cid in parts]
+    if not found:
+        return []
+
+    like_counts = dict(
+        db.query(CourseLike.course_id, func.count())
+        .filter(CourseLike.course_id.in_(found))
+        .group_by(CourseLike.course_id)
+        .all()
+    )
+    comment_counts = dict(
+        db.query(Comment.course_id, func.count())
+        .filter(Comment.course_id.in_(found))
+        .group_by(Comment.course_id)
+        .all()
+    )
+
+    return [
+        {
+            **parts[cid],
+            "course_like_count": int(like_counts.get(cid, 0)),
+            "comment_count": int(comment_counts.get(cid, 0)),
+        }
+        for cid in found
+    ]
@@ -0,0 +1,130 @@
+# app/utils/course_export.py
+"""
+/courses/export 的各種輸出格式；欄位一律用 excel_export.COURSE_EXPORT_HEADERS，
+匯入端（/admin/import）讀得回來：一個時段一列，同課號的多列匯入時合併回同一門課
+
+- xlsx：write-only workbook（excel_export.write_xlsx）
+- csv / ndjson：generator 邊讀邊吐，記憶體固定
+- parquet：pandas + pyarrow，分批寫入 row group
+"""
+import csv
+import io
+import json
+from tempfile import SpooledTemporaryFile
+from typing import Iterable, Iterator, List, Literal, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.utils.course_filters import CourseFilters
+from app.utils.course_rows import iter_export_courses
+from app.utils.excel_export import (
+    COURSE_EXPORT_HEADERS, XLSX_MEDIA_TYPE, SPOOL_MAX_SIZE, course_export_row, write_xlsx,
+)
+
+ExportFormat = Literal["xlsx", "csv", "ndjson", "parquet"]
+
+MEDIA_TYPES = {
+    "xlsx": XLSX_MEDIA_TYPE,
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+FLUSH_ROWS = 500
+PARQUET_INT_COLUMNS = {"年級", "學分數", "上課人數", "上課星期"}
+
+
+def iter_export_course_rows(filters: CourseFilters, db: Optional[Session] = None) -> Iterator[List[list]]:
+    """
+    依篩選條件逐門課產生匯出列（每個時段一列，沒有時段的課一列；順序同 COURSE_EXPORT_HEADERS）
+    沒給 db 就自己開一個 session（StreamingResponse 送資料時，request 的 session 可能已經關了）
+    """
+    own = db is None
+    if own:
+        db = SessionLocal()
+    try:
+        for course, teacher_name, _dept_name, times in iter_export_courses(db, filters):
+            yield [course_export_row(course, teacher_name, t) for t in (times or [None])]
+    finally:
+        if own:
+            db.close()
+
+
+def iter_export_rows(filters: CourseFilters, db: Optional[Session] = None) -> Iterator[list]:
+    for rows in iter_export_course_rows(filters, db):
+        yield from rows
+
+
+def iter_csv(headers: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+    # utf-8-sig：Excel 直接開也不會亂碼
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    buf.write("\ufeff")
+    writer.writerow(headers)
+    for i, r in enumerate(rows, start=1):
+        writer.writerow(["" if v is None else v for v in r])
+        if i % FLUSH_ROWS == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+def iter_ndjson(headers: Sequence[str], rows: Iterable[Sequence]) -> Iterator[bytes]:
+    lines = []
+    for r in rows:
+        lines.append(json.dumps(dict(zip(headers, r)), ensure_ascii=False))
+        if len(lines) >= FLUSH_ROWS:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def write_parquet(headers: Sequence[str], rows: Iterable[Sequence]):
+    """
+    每 FLUSH_ROWS 列轉成 DataFrame 寫一個 row group；schema 固定，避免某批整欄都是 None 時型別不一致
+    回傳已 seek(0) 的 SpooledTemporaryFile；沒裝 pyarrow 會丟 ImportError
+    """
+    import pandas as pd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        (h, pa.int64() if h in PARQUET_INT_COLUMNS else pa.string()) for h in headers
+    ])
+    dtypes = {h: ("Int64" if h in PARQUET_INT_COLUMNS else "string") for h in headers}
+
+    out = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    writer = pq.ParquetWriter(out, schema)
+    try:
+        batch = []
+        for r in rows:
+            batch.append(r)
+            if len(batch) >= FLUSH_ROWS:
+                df = pd.DataFrame(batch, columns=list(headers)).astype(dtypes)
+                writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+                batch = []
+        if batch:
+            df = pd.DataFrame(batch, columns=list(headers)).astype(dtypes)
+            writer.write_table(pa.Table.from_pandas(df, schema=schema, preserve_index=False))
+    finally:
+        writer.close()
+    out.seek(0)
+    return out
+
+
+def write_export_file(fmt: ExportFormat, rows: Iterable[Sequence]):
+    """
+    xlsx / parquet 要先寫完整個檔（zip / footer），回傳暫存檔
+    """
+    if fmt == "parquet":
+        return write_parquet(COURSE_EXPORT_HEADERS, rows)
+    return write_xlsx(COURSE_EXPORT_HEADERS, rows, sheet_name="Courses")
+
+
+def iter_export_stream(fmt: ExportFormat, rows: Iterable[Sequence]) -> Iterator[bytes]:
+    if fmt == "csv":
+        return iter_csv(COURSE_EXPORT_HEADERS, rows)
+    return iter_ndjson(COURSE_EXPORT_HEADERS, rows)
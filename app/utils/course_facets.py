@@ -0,0 +1,57 @@
+# app/utils/course_facets.py
+"""
+/courses/facets：目前篩選條件下，各選項的課程數（側欄下拉選單顯示「(23)」用）
+"""
+from collections import Counter
+from typing import Dict
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.catalog_version import get_catalog_version
+from app.utils.course_filters import CourseFilters, FACETS, facet_stmt
+
+_facet_cache = TTLCache(maxsize=settings.SEARCH_COUNT_CACHE_SIZE, ttl=settings.SEARCH_COUNT_CACHE_TTL)
+
+
+def _format(counts: Dict[str, Counter]) -> dict:
+    out = {}
+    for name in FACETS:
+        items = sorted(counts[name].items(), key=lambda kv: kv[0])
+        if name == "department":
+            out[name] = [{"value": d, "name": nm, "count": n} for (d, nm), n in items]
+        else:
+            out[name] = [{"value": v, "count": n} for v, n in items]
+    return out
+
+
+def query_facets(db: Session, filters: CourseFilters) -> dict:
+    """
+    一個 GROUPING SETS 查詢拿全部 facet；依 (catalog 版本, 篩選條件) 快取
+    """
+    key = (get_catalog_version(), filters)
+    hit = _facet_cache.get(key)
+    if hit is not None:
+        return hit
+
+    counts = {name: Counter() for name in FACETS}
+    for row in db.execute(facet_stmt(filters.shape), filters.params()).mappings():
+        for name in FACETS:
+            if row[f"g_{name}"] != 0:
+                continue
+            value = row[name]
+            if value is None:
+                break
+            if name == "department":
+                value = (value, row["department_name"])
+            counts[name][value] += row["count"]
+            break
+
+    result = _format(counts)
+    _facet_cache.set(key, result)
+    return result
+
+
+def snapshot_facets(snap, filters: CourseFilters) -> dict:
+    return _format(snap.facets(snap.search(filters)))
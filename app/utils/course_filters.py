@@ -0,0 +1,343 @@
+# app/utils/course_filters.py
+"""
+課程搜尋共用的篩選引擎（/courses、/courses/public、/courses/export、/comments/search）
+
+- CourseFilters：正規化後的篩選條件（去空白、time_slots 排序去重）
+- 同一種「形狀」（哪些條件有值）的 select() 只建一次（lru_cache），值全部用 bindparam 帶入，
+  所以每個請求不用重建 SQLAlchemy 物件，也會命中 SQLAlchemy 的 compiled cache
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Literal, Optional, Tuple
+
+from fastapi import Query
+from sqlalchemy import and_, or_, exists, select, func, cast, bindparam, tuple_, String
+from sqlalchemy.dialects.postgresql import BIT
+from sqlalchemy.orm import aliased
+
+from app.models.course import Course
+from app.models.teacher import Teacher
+from app.models.department import Department
+from app.models.course_time import CourseTime
+from app.models.favorite import Favorite
+from app.utils.timeslots import SLOT_BITS, SLOT_SECTIONS, FULL_MASK, parse_time_slots, slots_to_mask, mask_to_bits
+
+SlotMode = Literal["any", "within"]
+Order = Literal["id", "favorite", "relevance"]
+Seek = Optional[Literal["id", "fav_true", "fav_false"]]
+
+
+def _norm(v: Optional[str]) -> Optional[str]:
+    if v is None:
+        return None
+    v = v.strip()
+    return v or None
+
+
+@dataclass(frozen=True)
+class CourseFilters:
+    keyword: Optional[str] = None
+    semester: Optional[str] = None
+    required_type: Optional[str] = None
+    grade: Optional[int] = None
+    teacher: Optional[str] = None
+    category: Optional[str] = None
+    department: Optional[str] = None
+    slots: Tuple[Tuple[int, int], ...] = ()
+    slot_mode: SlotMode = "any"
+    weekday: Optional[int] = None
+    start_section: Optional[int] = None
+    end_section: Optional[int] = None
+
+    @classmethod
+    def build(
+        cls, keyword=None, semester=None, required_type=None, grade=None, teacher=None,
+        category=None, department=None, time_slots=None, slot_mode="any",
+        weekday=None, start_section=None, end_section=None,
+    ) -> "CourseFilters":
+        return cls(
+            keyword=_norm(keyword),
+            semester=_norm(semester),
+            required_type=_norm(required_type),
+            grade=grade,
+            teacher=_norm(teacher),
+            category=_norm(category),
+            department=_norm(department),
+            slots=tuple(parse_time_slots(time_slots)),
+            slot_mode=slot_mode,
+            weekday=weekday,
+            start_section=start_section,
+            end_section=end_section,
+        )
+
+    @property
+    def shape(self) -> tuple:
+        """
+        哪些條件有值（加上 slot_mode）；同 shape 共用同一個 statement
+        """
+        return (
+            self.keyword is not None,
+            self.semester is not None,
+            self.required_type is not None,
+            self.grade is not None,
+            self.teacher is not None,
+            self.category is not None,
+            self.department is not None,
+            self.slot_mode if self.slots else None,
+            self.weekday is not None,
+            self.start_section is not None,
+            self.end_section is not None,
+        )
+
+    def params(self) -> dict:
+        """
+        bindparam 的值；沒用到的 key 執行時會被忽略
+        """
+        p = {
+            "semester": self.semester,
+            "required_type": self.required_type,
+            "grade": self.grade,
+            "category": self.category,
+            "weekday": self.weekday,
+            "start_section": self.start_section,
+            "end_section": self.end_section,
+        }
+        if self.keyword is not None:
+            p["keyword"] = self.keyword
+            p["keyword_like"] = f"%{self.keyword}%"
+        if self.department is not None:
+            p["department"] = self.department
+            p["department_like"] = f"%{self.department}%"
+        if self.teacher is not None:
+            p["teacher"] = self.teacher
+            p["teacher_like"] = f"%{self.teacher}%"
+        if self.slots:
+            mask = slots_to_mask(list(self.slots))
+            # within：課程不能佔用勾選以外的格子
+            p["slot_bits"] = mask_to_bits(FULL_MASK & ~mask if self.slot_mode == "within" else mask)
+        return p
+
+
+def course_filter_params(
+    keyword: Optional[str] = Query(None, description="課程名稱關鍵字（中/英）"),
+    semester: Optional[str] = Query(None, description="學期，例如 1141"),
+    required_type: Optional[str] = Query(None, description="課別，例如 專業必修(系所)"),
+    grade: Optional[int] = Query(None, description="年級"),
+    teacher: Optional[str] = Query(None, description="教師（可用代碼或姓名關鍵字）"),
+    category: Optional[str] = Query(None, description="課程分類（category 欄位）"),
+
+    # 同時支援「系所代碼」或「系所名稱」
+    department: Optional[str] = Query(None, description="系所（可輸入代碼或名稱關鍵字）"),
+
+    time_slots: list[str] | None = Query(None, description="多選: 1-1,1-2,3-5..."),
+    slot_mode: SlotMode = Query(
+        "any",
+        description=(
+            "any：有上到任一勾選格子；within：所有時段都在勾選的格子內。"
+            "同時給 weekday / start_section / end_section 時，any 要求同一個上課時段既符合星期節次、又佔到勾選格子；"
+            "within 則是各自判斷（整門課都在格子內，且有某個時段符合星期節次）"
+        ),
+    ),
+
+    weekday: Optional[int] = Query(None, ge=1, le=7, description="上課星期 1~7"),
+    start_section: Optional[int] = Query(None, ge=1, le=15, description="起始節次"),
+    end_section: Optional[int] = Query(None, ge=1, le=15, description="結束節次"),
+) -> CourseFilters:
+    """
+    FastAPI dependency：各搜尋 endpoint 共用同一組 query 參數
+    """
+    return CourseFilters.build(
+        keyword, semester, required_type, grade, teacher, category, department,
+        time_slots, slot_mode, weekday, start_section, end_section,
+    )
+
+
+# ---------- 依 shape 建 where 條件（只在 shape 第一次出現時執行） ----------
+def _conditions(shape: tuple) -> list:
+    (has_keyword, has_semester, has_required_type, has_grade, has_teacher, has_category,
+     has_department, slot_mode, has_weekday, has_start, has_end) = shape
+
+    conds = []
+    # 課程名稱（中/英）ILIKE '%k%'，兩欄各自有 pg_trgm GIN 索引，會走 BitmapOr
+    if has_keyword:
+        k = bindparam("keyword_like")
+        conds.append(or_(Course.name_zh.ilike(k), Course.name_en.ilike(k)))
+    if has_semester:
+        conds.append(Course.semester == bindparam("semester"))
+    if has_required_type:
+        conds.append(Course.required_type == bindparam("required_type"))
+    if has_grade:
+        conds.append(Course.grade == bindparam("grade"))
+    if has_category:
+        conds.append(Course.category == bindparam("category"))
+
+    # 系所 / 教師：代碼 或 名稱關鍵字；名稱比對放在子查詢（各自的 trigram 索引），不 OR 跨 join 的欄位
+    if has_department:
+        conds.append(or_(
+            Course.department_id == bindparam("department"),
+            Course.department_id.in_(
+                select(Department.id).where(Department.name.ilike(bindparam("department_like")))
+            ),
+        ))
+    if has_teacher:
+        conds.append(or_(
+            Course.teacher_id == bindparam("teacher"),
+            Course.teacher_id.in_(
+                select(Teacher.id).where(Teacher.name.ilike(bindparam("teacher_like")))
+            ),
+        ))
+
+    # 時段格子：courses.time_mask 位元運算，不 join course_time
+    # - any：至少佔用其中一格
+    # - within：所有時段都在勾選的格子裡（且至少有一個時段）
+    if slot_mode is not None:
+        zero = cast(mask_to_bits(0), BIT(SLOT_BITS))
+        bits = cast(bindparam("slot_bits"), BIT(SLOT_BITS))
+        if slot_mode == "within":
+            conds.append(and_(Course.time_mask != zero, Course.time_mask.op("&")(bits) == zero))
+        else:
+            conds.append(Course.time_mask.op("&")(bits) != zero)
+
+    # 星期 / 節次範圍：EXISTS，同一筆 CourseTime 要同時符合；不用 join + DISTINCT
+    # 子查詢用 CourseTime 的別名並明確 correlate(Course)：export_stmt 外層已 outer join CourseTime，
+    # 不用別名的話兩張表都會被 auto-correlate 掉
+    ct = aliased(CourseTime)
+    time_conds = []
+    if has_weekday:
+        time_conds.append(ct.weekday == bindparam("weekday"))
+    # 只要完全落在 start_section ~ end_section 之間
+    if has_start:
+        time_conds.append(ct.start_section >= bindparam("start_section"))
+    if has_end:
+        time_conds.append(ct.end_section <= bindparam("end_section"))
+    # any + 星期 / 節次：和舊版一樣，命中勾選格子的必須是同一筆 CourseTime
+    # 取 slot_bits 裡這筆時段那一天 start~end 的子字串，有 '1' 就代表有重疊（超過第 20 節的部分不算）
+    # start_section 不在 1~20、或 end < start 的資料視為不重疊：長度用 greatest(..., 0) 夾住，
+    # 否則 Postgres 會因 negative substring length 報錯（AND 的求值順序不保證，不能只靠前面的條件）
+    if time_conds and slot_mode == "any":
+        start = (ct.weekday - 1) * SLOT_SECTIONS + ct.start_section
+        length = func.greatest(func.least(ct.end_section, SLOT_SECTIONS) - ct.start_section + 1, 0)
+        time_conds.append(ct.start_section.between(1, SLOT_SECTIONS))
+        time_conds.append(func.strpos(func.substr(bindparam("slot_bits", type_=String), start, length), "1") > 0)
+    if time_conds:
+        conds.append(exists().where(and_(ct.course_id == Course.id, *time_conds)).correlate(Course))
+
+    return conds
+
+
+def _where(stmt, shape: tuple):
+    conds = _conditions(shape)
+    return stmt.where(and_(*conds)) if conds else stmt
+
+
+def _is_favorite():
+    return exists().where(and_(
+        Favorite.user_id == bindparam("user_id"),
+        Favorite.course_id == Course.id,
+    ))
+
+
+def _relevance():
+    # 相關度（0~1）：關鍵字和中/英課名的 word_similarity 取大者
+    k = bindparam("keyword")
+    return func.greatest(
+        func.word_similarity(k, Course.name_zh),
+        func.word_similarity(k, func.coalesce(Course.name_en, "")),
+    )
+
+
+@lru_cache(maxsize=512)
+def ids_stmt(shape: tuple):
+    return _where(select(Course.id), shape)
+
+
+@lru_cache(maxsize=512)
+def count_stmt(shape: tuple):
+    return _where(select(func.count()).select_from(Course), shape)
+
+
+@lru_cache(maxsize=512)
+def page_stmt(shape: tuple, with_favorite: bool = False, order: Order = "id", seek: Seek = None):
+    """
+    第一段查詢：這一頁的 course_id（with_favorite 時多一欄 is_favorite）
+    需要的額外參數：offset / limit，with_favorite -> user_id，seek -> last_id
+    """
+    is_fav = _is_favorite()
+    cols = [Course.id, is_fav.label("is_favorite")] if with_favorite else [Course.id]
+    stmt = _where(select(*cols), shape)
+
+    # keyset：排序鍵 (is_favorite desc, id asc) 或 (id asc)
+    last_id = bindparam("last_id")
+    if seek == "id":
+        stmt = stmt.where(Course.id > last_id)
+    elif seek == "fav_true":
+        stmt = stmt.where(or_(~is_fav, Course.id > last_id))
+    elif seek == "fav_false":
+        stmt = stmt.where(and_(~is_fav, Course.id > last_id))
+
+    if order == "relevance":
+        stmt = stmt.order_by(_relevance().desc(), Course.id.asc())
+    elif order == "favorite":
+        stmt = stmt.order_by(is_fav.desc(), Course.id.asc())
+    else:
+        stmt = stmt.order_by(Course.id.asc())
+
+    return stmt.offset(bindparam("offset")).limit(bindparam("limit"))
+
+
+@lru_cache(maxsize=512)
+def export_stmt(shape: tuple):
+    """
+    匯出用：Course + 教師姓名 + 系所名稱 + 時段（outer join，一門課可能多列），
+    依 (course id, weekday, start_section) 排序，方便邊讀邊依課程分組
+    """
+    stmt = (
+        select(
+            Course,
+            Teacher.name.label("teacher_name"),
+            Department.name.label("department_name"),
+            CourseTime,
+        )
+        .outerjoin(Teacher, Teacher.id == Course.teacher_id)
+        .outerjoin(Department, Department.id == Course.department_id)
+        .outerjoin(CourseTime, CourseTime.course_id == Course.id)
+    )
+    return _where(stmt, shape).order_by(Course.id.asc(), CourseTime.weekday, CourseTime.start_section)
+
+
+# facet 欄位：名稱 -> 欄位（weekday 來自 course_time）
+FACETS = ("department", "required_type", "grade", "category", "weekday", "credit")
+
+
+@lru_cache(maxsize=512)
+def facet_stmt(shape: tuple):
+    """
+    /courses/facets：一次 GROUPING SETS 算出各欄位的課程數
+    weekday 要 join（去重後的）course_time，一門課會變多列，所以用 count(DISTINCT id)
+    每列用 grouping(欄位) = 0 判斷是哪個 facet
+    """
+    weekdays = select(CourseTime.course_id, CourseTime.weekday).distinct().subquery()
+    cols = {
+        "department": Course.department_id,
+        "required_type": Course.required_type,
+        "grade": Course.grade,
+        "category": Course.category,
+        "weekday": weekdays.c.weekday,
+        "credit": Course.credit,
+    }
+    stmt = (
+        select(
+            *[c.label(name) for name, c in cols.items()],
+            Department.name.label("department_name"),
+            *[func.grouping(c).label(f"g_{name}") for name, c in cols.items()],
+            func.count(Course.id.distinct()).label("count"),
+        )
+        .outerjoin(Department, Department.id == Course.department_id)
+        .outerjoin(weekdays, weekdays.c.course_id == Course.id)
+    )
+    stmt = _where(stmt, shape)
+    sets = [
+        tuple_(Course.department_id, Department.name) if name == "department" else c
+        for name, c in cols.items()
+    ]
+    return stmt.group_by(func.grouping_sets(*sets))
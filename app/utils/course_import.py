@@ -0,0 +1,689 @@
+# app/utils/course_import.py
+"""
+/admin/import 的課表解析與批次寫入
+
+- 解析：DataFrame -> 系所 / 教師 / 課程 / 時段（每張表一個 dict / list）
+- 寫入：每張表先用一個查詢拿既有的 key，再用批次 INSERT ... ON CONFLICT 寫入
+  mode=skip 已存在的課程略過；mode=update 內容雜湊（content_hash）不同才更新，時段整批換掉
+- 試跑：diff_import 只比對雜湊，回報新增 / 更新 / 未變 / 檔案裡沒有的課程，不寫入
+- 多檔 / 多工作表：parse_course_files 用 process pool 平行解析，合併後以課號去重
+- 大檔：iter_sheet_chunks 用 openpyxl read-only 逐段讀，import_chunked 每批 commit 並回報壞掉的列
+"""
+import hashlib
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Literal, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from openpyxl import load_workbook
+from sqlalchemy import String, and_, bindparam, delete, select
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.models.course import Course
+from app.models.teacher import Teacher
+from app.models.department import Department
+from app.models.course_time import CourseTime
+from app.utils.timeslots import ranges_to_mask, mask_to_bits
+
+ImportMode = Literal["skip", "update"]
+
+BATCH_SIZE = 1000
+
+# 匯入時會寫入 / 比對的課程欄位（id 以外）
+COURSE_COLUMNS = (
+    "name_zh", "name_en", "department_id", "teacher_id", "grade", "class_group", "group_code",
+    "credit", "required_type", "category", "limit_max", "chinese_summary", "english_summary",
+    "raw_remark", "semester", "time_mask",
+)
+TIME_COLUMNS = ("weekday", "start_section", "end_section", "classroom")
+
+
+#excel匯入功能
+def to_str(v):
+    if pd.isna(v):
+        return None
+    s = str(v).strip()
+    return None if s == "" or s.lower() == "nan" else s
+
+
+def to_int(v):
+    if pd.isna(v):
+        return None
+    try:
+        return int(float(v))
+    except Exception:
+        return None
+
+
+def parse_sections(text):
+    # "2,3,4" -> (2,4)；匯出檔的 "3-5" -> (3,5)
+    if text is None or (isinstance(text, float) and pd.isna(text)):
+        return None, None
+    try:
+        parts = [int(str(x).strip()) for x in str(text).replace("-", ",").split(",") if str(x).strip() != ""]
+        if not parts:
+            return None, None
+        return min(parts), max(parts)
+    except Exception:
+        return None, None
+
+
+def find_header_row(df_raw: pd.DataFrame) -> int:
+    # 找到包含「科目代碼(新碼全碼)」的那一列當表頭
+    target = "科目代碼(新碼全碼)"
+    for i in range(min(30, len(df_raw))):
+        row = df_raw.iloc[i].astype(str).tolist()
+        if any(target in cell for cell in row):
+            return i
+    return -1
+
+
+def read_course_table(fileobj, filename: Optional[str], sheet_name=0) -> pd.DataFrame:
+    """
+    讀匯入檔成 DataFrame（欄名 = 表頭）；fileobj 可以是檔案物件或路徑，副檔名看 filename
+    - .xlsx / .xls / .csv：原始課表可能有前置說明列，先找表頭那一列
+    - .parquet / .ndjson：/courses/export 匯出的檔，第一列就是欄名
+    - sheet_name：Excel 讀哪個工作表（預設第一個）
+    """
+    suffix = Path(filename or "").suffix.lower()
+    if suffix == ".parquet":
+        return pd.read_parquet(fileobj)
+    if suffix in (".ndjson", ".jsonl"):
+        return pd.read_json(fileobj, lines=True, dtype=False)
+
+    if suffix == ".csv":
+        df_raw = pd.read_csv(fileobj, header=None, dtype=str, encoding="utf-8-sig", keep_default_na=False)
+    else:
+        df_raw = pd.read_excel(fileobj, header=None, sheet_name=sheet_name)
+
+    header_i = find_header_row(df_raw)
+    if header_i == -1:
+        raise HTTPException(status_code=400, detail="Cannot find header row in Excel")
+
+    header = df_raw.iloc[header_i].tolist()
+    df = df_raw.iloc[header_i + 1:].copy()
+    df.columns = [str(c).strip() for c in header]
+    return df.reset_index(drop=True)
+
+
+def content_hash(course: dict, times: List[dict]) -> str:
+    """
+    COURSE_COLUMNS + 時段（排序後）的 sha256 hex；None 和空字串算不同
+    """
+    def enc(values) -> str:
+        return "\x1f".join("\x00" if v is None else str(v) for v in values)
+
+    h = hashlib.sha256(enc(course.get(c) for c in COURSE_COLUMNS).encode("utf-8"))
+    for t in sorted(enc(t.get(c) for c in TIME_COLUMNS) for t in times):
+        h.update(("\x1e" + t).encode("utf-8"))
+    return h.hexdigest()
+
+
+# 教師代碼有、姓名空白時的佔位姓名；update 模式不會拿它蓋掉資料庫裡的真實姓名
+UNKNOWN_TEACHER = "unknown"
+
+
+@dataclass
+class ParsedImport:
+    departments: Dict[str, str] = field(default_factory=dict)       # id -> name
+    teachers: Dict[str, str] = field(default_factory=dict)          # id -> name
+    courses: Dict[str, dict] = field(default_factory=dict)          # id -> 欄位
+    times: Dict[str, List[dict]] = field(default_factory=dict)      # course_id -> 時段
+    rows: int = 0                                                   # 讀到的資料列數
+
+
+# ---------- 欄位向量化正規化（語意同 to_str / to_int / parse_sections） ----------
+def _none_unless(s: pd.Series, keep: pd.Series) -> pd.Series:
+    # object 欄位，keep 為 False 的位置放 None（不要 NaN，寫 DB 時才是 NULL）
+    s = s.astype(object).copy()
+    s[~keep] = None
+    return s
+
+
+def col_str(s: pd.Series) -> pd.Series:
+    """
+    整欄版 to_str：NA -> None；去頭尾空白；空字串或 "nan" -> None
+    """
+    na = s.isna()
+    out = s.astype(str).str.strip()
+    return _none_unless(out, ~na & (out != "") & (out.str.lower() != "nan"))
+
+
+def col_int(s: pd.Series) -> pd.Series:
+    """
+    整欄版 to_int：int(float(v))，轉不了（含 NA / inf）-> None；值是 Python int
+    """
+    text = s.astype(str).str.strip().where(s.notna())
+    num = pd.to_numeric(text, errors="coerce")
+    ok = num.notna() & np.isfinite(num.fillna(0))
+    vals = pd.Series(np.trunc(num.where(ok, 0)).astype("int64").tolist(), index=s.index, dtype=object)
+    return _none_unless(vals, ok)
+
+
+def col_sections(text: pd.Series):
+    """
+    整欄版 parse_sections（輸入是已經 col_str 過的欄位）：回傳 (start, end) 兩欄，解析不了 -> None
+    任何一段不是整數整筆就不算，和 parse_sections 相同
+    """
+    parts = (
+        text.dropna()
+        .str.replace("-", ",", regex=False)
+        .str.split(",")
+        .explode()
+        .str.strip()
+    )
+    parts = parts[parts.notna() & (parts != "")]
+    ok = parts.str.fullmatch(r"[+-]?\d+").astype(bool)
+    bad = parts.index[~ok].unique()
+
+    grouped = parts[ok].astype("int64").groupby(level=0)
+    start = grouped.min().drop(bad, errors="ignore").astype(object).reindex(text.index)
+    end = grouped.max().drop(bad, errors="ignore").astype(object).reindex(text.index)
+    return _none_unless(start, start.notna()), _none_unless(end, end.notna())
+
+
+def _coalesce(a: pd.Series, b: pd.Series) -> pd.Series:
+    # 整欄版 `a or b`（a、b 都是 col_str 的結果）
+    out = a.where(a.notna(), b)
+    return _none_unless(out, out.notna())
+
+
+def _col(df: pd.DataFrame, name: str) -> pd.Series:
+    # 沒有這一欄就當整欄 NA（同 row.get() 回 None）
+    if name in df.columns:
+        return df[name]
+    return pd.Series([None] * len(df), index=df.index, dtype=object)
+
+
+def parse_course_frame(df: pd.DataFrame) -> ParsedImport:
+    """
+    整欄運算解析（不逐列 iterrows）
+    - 同一個課號出現多次時，課程欄位以第一列為準；時段收集所有列（相同的 星期/節次/教室 只留一筆）
+    """
+    df = df.loc[:, ~df.columns.duplicated()].reset_index(drop=True)
+    out = ParsedImport(rows=len(df))
+
+    dept = col_str(_col(df, "系所代碼"))
+    teacher_id = _coalesce(col_str(_col(df, "主開課教師代碼(舊碼)")), col_str(_col(df, "授課教師代碼(舊碼)")))
+    teacher_name = _coalesce(col_str(_col(df, "主開課教師姓名")), col_str(_col(df, "授課教師姓名")))
+
+    # 沒有系所名稱就先空字串；教師同一個代碼以最後一列有填的姓名為準，都沒填才用 UNKNOWN_TEACHER
+    out.departments = dict.fromkeys(dept.dropna().tolist(), "")
+    has_teacher = teacher_id.notna()
+    named = has_teacher & teacher_name.notna()
+    out.teachers = dict.fromkeys(teacher_id[has_teacher & ~named].tolist(), UNKNOWN_TEACHER)
+    out.teachers.update(zip(teacher_id[named].tolist(), teacher_name[named].tolist()))
+
+    # 課程：每個課號只留第一列
+    course_id = col_str(_col(df, "科目代碼(新碼全碼)"))
+    first = course_id.notna() & ~course_id.duplicated(keep="first")
+    rows = df[first]
+    cid = course_id[first]
+
+    courses = pd.DataFrame({
+        "id": cid,
+        "name_zh": col_str(_col(rows, "科目中文名稱")).where(lambda x: x.notna(), ""),
+        "name_en": col_str(_col(rows, "科目英文名稱")),
+        "department_id": dept[first].where(dept[first].notna(), "unknown"),
+        "teacher_id": teacher_id[first].where(teacher_id[first].notna(), "unknown"),
+        "grade": col_int(_col(rows, "年級")),
+        "class_group": col_str(_col(rows, "上課班組")),
+        "group_code": col_str(_col(rows, "科目組別")),
+        "credit": col_int(_col(rows, "學分數")).where(lambda x: x.notna() & (x != 0), 0),
+        "required_type": col_str(_col(rows, "課別名稱")),
+        "category": col_str(_col(rows, "課別代碼")),
+        "limit_max": col_int(_col(rows, "上課人數")),
+        "chinese_summary": col_str(_col(rows, "課程中文摘要")),
+        "english_summary": col_str(_col(rows, "課程英文摘要")),
+        "raw_remark": col_str(_col(rows, "課表備註")),
+        "semester": col_str(_col(rows, "學期")),
+    }, dtype=object)
+
+    # 時段：該課號的每一列（一門課多個上課時間時，課表是一個時段一列）
+    has_id = course_id.notna()
+    time_rows = df[has_id]
+    weekday = col_int(_col(time_rows, "上課星期"))
+    start, end = col_sections(col_str(_col(time_rows, "上課節次")))
+    has_time = weekday.notna() & start.notna() & end.notna()
+
+    times = pd.DataFrame({
+        "course_id": course_id[has_id],
+        "weekday": weekday,
+        "start_section": start,
+        "end_section": end,
+        "classroom": col_str(_col(time_rows, "上課地點")),
+    }, dtype=object)[has_time].drop_duplicates(keep="first")
+
+    # time_mask：不同課程的 mask 種類很少，轉字串的結果共用
+    bits_cache: Dict[int, str] = {}
+    masks: Dict[str, int] = {}
+    for c, w, s_, e in zip(times["course_id"], times["weekday"], times["start_section"], times["end_section"]):
+        masks[c] = masks.get(c, 0) | ranges_to_mask([(w, s_, e)])
+
+    def bits(m: int) -> str:
+        b = bits_cache.get(m)
+        if b is None:
+            b = bits_cache[m] = mask_to_bits(m)
+        return b
+
+    courses["time_mask"] = [bits(masks.get(c, 0)) for c in cid.tolist()]
+
+    time_records = times.to_dict("records")
+    out.courses = {r["id"]: r for r in courses.to_dict("records")}
+    out.times = {c: [] for c in out.courses}
+    for t in time_records:
+        out.times[t["course_id"]].append(t)
+    for c, rec in out.courses.items():
+        rec["content_hash"] = content_hash(rec, out.times[c])
+    return out
+
+
+def _batches(items: list, size: int = BATCH_SIZE):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _existing_hashes(db: Session, ids: List[str]) -> Dict[str, Optional[str]]:
+    # 一個查詢、一個 array 參數（= ANY），不受 IN 清單參數數量限制
+    if not ids:
+        return {}
+    stmt = select(Course.id, Course.content_hash).where(Course.id == bindparam("ids", type_=ARRAY(String)).any_())
+    return dict(db.execute(stmt, {"ids": ids}).all())
+
+
+def bulk_import(
+    db: Session,
+    parsed: ParsedImport,
+    mode: ImportMode = "skip",
+    on_progress: Optional[Callable[[str, int, int], None]] = None,
+) -> dict:
+    """
+    寫入 parsed；不 commit（由呼叫端決定）
+    on_progress(step, done, total)：step 是 "courses"（處理過的課程數，含略過的）或 "times"（寫入的時段數）
+    """
+    def report(step: str, done: int, total: int) -> None:
+        if on_progress is not None:
+            on_progress(step, done, total)
+
+    # 系所 / 教師：先確保 FK 都存在
+    for batch in _batches([{"id": d, "name": nm} for d, nm in parsed.departments.items()]):
+        db.execute(insert(Department).values(batch).on_conflict_do_nothing(index_elements=["id"]))
+
+    for batch in _batches([{"id": t, "name": nm} for t, nm in parsed.teachers.items()]):
+        stmt = insert(Teacher).values(batch)
+        if mode == "update":
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["id"],
+                set_={"name": stmt.excluded.name},
+                # 佔位姓名不覆蓋既有的真實姓名
+                where=and_(
+                    stmt.excluded.name != UNKNOWN_TEACHER,
+                    Teacher.name.is_distinct_from(stmt.excluded.name),
+                ),
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=["id"])
+        db.execute(stmt)
+
+    # 課程
+    course_ids = list(parsed.courses)
+    existing = _existing_hashes(db, course_ids)
+    new_ids = [cid for cid in course_ids if cid not in existing]
+    updated_ids: List[str] = []
+
+    # 只送雜湊不同的課程（整份重傳、只改幾門時，其他列完全不碰）
+    changed = [
+        parsed.courses[cid] for cid in course_ids
+        if cid in existing and existing[cid] != parsed.courses[cid]["content_hash"]
+    ] if mode == "update" else []
+
+    # 不用寫的課程（雜湊相同，或 skip 模式下已存在）一開始就算處理過
+    done = len(course_ids) - len(new_ids) - len(changed)
+    report("courses", done, len(course_ids))
+    for batch in _batches([parsed.courses[cid] for cid in new_ids]):
+        db.execute(insert(Course).values(batch).on_conflict_do_nothing(index_elements=["id"]))
+        done += len(batch)
+        report("courses", done, len(course_ids))
+
+    if changed:
+        for batch in _batches(changed):
+            stmt = insert(Course).values(batch)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["id"],
+                set_={c: getattr(stmt.excluded, c) for c in COURSE_COLUMNS + ("content_hash",)},
+                where=Course.content_hash.is_distinct_from(stmt.excluded.content_hash),
+            ).returning(Course.id)
+            updated_ids.extend(db.execute(stmt).scalars())
+            done += len(batch)
+            report("courses", done, len(course_ids))
+
+        # 有更新的課程，時段整批換掉
+        if updated_ids:
+            db.execute(
+                delete(CourseTime)
+                .where(CourseTime.course_id == bindparam("ids", type_=ARRAY(String)).any_())
+                .execution_options(synchronize_session=False),
+                {"ids": updated_ids},
+            )
+
+    # 時段：新課程 + 有更新的課程
+    time_rows = [t for cid in new_ids + updated_ids for t in parsed.times.get(cid, [])]
+    report("times", 0, len(time_rows))
+    for i, batch in enumerate(_batches(time_rows)):
+        db.execute(insert(CourseTime), batch)
+        report("times", min((i + 1) * BATCH_SIZE, len(time_rows)), len(time_rows))
+
+    return {
+        "inserted_courses": len(new_ids),
+        "updated_courses": len(updated_ids),
+        "skipped_courses": len(existing) - len(updated_ids),
+        "inserted_times": len(time_rows),
+    }
+
+
+def _field_changes(db: Session, parsed: ParsedImport, ids: List[str]) -> List[dict]:
+    """
+    ids 這幾門課和資料庫比，列出哪些欄位不同（時段有變記成 "times"）
+    """
+    if not ids:
+        return []
+    any_ids = bindparam("ids", type_=ARRAY(String)).any_()
+    cols = [getattr(Course, c) for c in COURSE_COLUMNS]
+    db_rows = {r[0]: r[1:] for r in db.execute(select(Course.id, *cols).where(Course.id == any_ids), {"ids": ids})}
+
+    db_times: Dict[str, list] = {cid: [] for cid in ids}
+    tcols = [getattr(CourseTime, c) for c in TIME_COLUMNS]
+    for r in db.execute(select(CourseTime.course_id, *tcols).where(CourseTime.course_id == any_ids), {"ids": ids}):
+        db_times[r[0]].append(tuple(r[1:]))
+
+    out = []
+    for cid in ids:
+        new = parsed.courses[cid]
+        fields = [c for c, old in zip(COURSE_COLUMNS, db_rows.get(cid, ())) if old != new[c]]
+        new_times = [tuple(t[c] for c in TIME_COLUMNS) for t in parsed.times.get(cid, [])]
+        if sorted(map(repr, db_times[cid])) != sorted(map(repr, new_times)):
+            fields.append("times")
+        out.append({"id": cid, "fields": fields})
+    return out
+
+
+def diff_import(db: Session, parsed: ParsedImport, detail_limit: int = 200) -> dict:
+    """
+    試跑：用 content_hash 和資料庫比對，不寫入
+    - removed：檔案裡出現的學期中、資料庫有但檔案沒有的課程（匯入本身不會刪除它們）
+    - 既有課程 content_hash 是 NULL（舊資料 / 手動改過）一律算 updated
+    """
+    course_ids = list(parsed.courses)
+    existing = _existing_hashes(db, course_ids)
+    inserted = [cid for cid in course_ids if cid not in existing]
+    updated = [
+        cid for cid in course_ids
+        if cid in existing and existing[cid] != parsed.courses[cid]["content_hash"]
+    ]
+
+    semesters = sorted({c["semester"] for c in parsed.courses.values() if c["semester"]})
+    removed: List[str] = []
+    if semesters:
+        stmt = (
+            select(Course.id)
+            .where(Course.semester == bindparam("semesters", type_=ARRAY(String)).any_())
+            .order_by(Course.id)
+        )
+        removed = [cid for cid in db.execute(stmt, {"semesters": semesters}).scalars() if cid not in parsed.courses]
+
+    return {
+        "dry_run": True,
+        "inserted_courses": len(inserted),
+        "updated_courses": len(updated),
+        "unchanged_courses": len(existing) - len(updated),
+        "removed_courses": len(removed),
+        "details": {
+            "inserted": inserted[:detail_limit],
+            "updated": _field_changes(db, parsed, updated[:detail_limit]),
+            "removed": removed[:detail_limit],
+        },
+    }
+
+
+# ---------- 多檔 / 多工作表（process pool 平行解析） ----------
+EXCEL_SUFFIXES = (".xlsx", ".xlsm", ".xls")
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def _get_parse_pool() -> ProcessPoolExecutor:
+    # spawn：server process 有其他 thread（DB pool、背景工作），不用 fork
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=settings.IMPORT_PARSE_WORKERS or os.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _parse_pool
+
+
+def _sheet_tasks(path: str, filename: str) -> List[Tuple[str, str, object]]:
+    if Path(filename).suffix.lower() not in EXCEL_SUFFIXES:
+        return [(path, filename, 0)]
+    with pd.ExcelFile(path) as xf:
+        return [(path, filename, name) for name in xf.sheet_names]
+
+
+def _parse_sheet(path: str, filename: str, sheet) -> Optional[ParsedImport]:
+    """
+    pool worker：解析一個工作表；找不到表頭（說明頁之類）回 None
+    """
+    try:
+        df = read_course_table(path, filename, sheet_name=sheet)
+    except HTTPException:
+        return None
+    return parse_course_frame(df)
+
+
+def merge_parsed(parts: Iterable[ParsedImport]) -> ParsedImport:
+    """
+    依順序合併：課號以第一次出現為準（和單一檔案相同），教師姓名以最後出現的真實姓名為準
+    """
+    out = ParsedImport()
+    for p in parts:
+        out.rows += p.rows
+        for d, name in p.departments.items():
+            out.departments.setdefault(d, name)
+        for t, name in p.teachers.items():
+            if name != UNKNOWN_TEACHER or t not in out.teachers:
+                out.teachers[t] = name
+        for cid, c in p.courses.items():
+            if cid not in out.courses:
+                out.courses[cid] = c
+                out.times[cid] = p.times.get(cid, [])
+    return out
+
+
+def parse_course_files(
+    files: List[Tuple[str, str]],
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> ParsedImport:
+    """
+    files：(暫存檔路徑, 原始檔名)；每個檔案的每個工作表一個工作丟進 process pool，
+    依 上傳順序 -> 工作表順序 合併並以課號去重
+    on_progress(解析完的工作表數, 工作表總數)
+    """
+    tasks = [(i, *t) for i, (path, name) in enumerate(files) for t in _sheet_tasks(path, name)]
+    args = [t[1:] for t in tasks]
+    if on_progress is not None:
+        on_progress(0, len(args))
+    if len(args) == 1:
+        it = iter([_parse_sheet(*args[0])])
+    else:
+        it = _get_parse_pool().map(_parse_sheet, *zip(*args))
+    results = []
+    for r in it:
+        results.append(r)
+        if on_progress is not None:
+            on_progress(len(results), len(args))
+
+    parsed_files = {t[0] for t, r in zip(tasks, results) if r is not None}
+    missing = [name for i, (_, name) in enumerate(files) if i not in parsed_files]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Cannot find header row in: {', '.join(missing)}")
+    return merge_parsed(r for r in results if r is not None)
+
+
+# ---------- 分批匯入（大檔） ----------
+def iter_sheet_chunks(fileobj, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    openpyxl read-only 逐列讀第一個工作表，只用前 30 列找表頭，之後每 chunk_rows 列一個 DataFrame
+    DataFrame 的 index 是 Excel 的列號（1-based），錯誤報告用
+    """
+    wb = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = wb.worksheets[0].iter_rows(values_only=True)
+        head = list(islice(rows, 30))
+        header_i = find_header_row(pd.DataFrame(head))
+        if header_i == -1:
+            raise HTTPException(status_code=400, detail="Cannot find header row in Excel")
+        header = [str(c).strip() for c in head[header_i]]
+
+        row_no = header_i + 2
+        pending = head[header_i + 1:]
+        while True:
+            pending.extend(islice(rows, max(chunk_rows - len(pending), 0)))
+            if not pending:
+                break
+            yield pd.DataFrame(
+                [list(r) + [None] * (len(header) - len(r)) for r in pending],
+                columns=header,
+                index=range(row_no, row_no + len(pending)),
+            )
+            row_no += len(pending)
+            pending = []
+    finally:
+        wb.close()
+
+
+def scan_sheet(fileobj, chunk_rows: int) -> Tuple[List[str], int]:
+    """
+    先掃一遍（read-only，記憶體固定）：檔案裡有哪些學期、總共幾列
+    """
+    semesters: set = set()
+    rows = 0
+    for df in iter_sheet_chunks(fileobj, chunk_rows):
+        df = df.loc[:, ~df.columns.duplicated()]
+        semesters.update(col_str(_col(df, "學期")).dropna().unique().tolist())
+        rows += len(df)
+    return sorted(semesters), rows
+
+
+def _db_error(e: Exception) -> str:
+    msg = str(getattr(e, "orig", None) or e)
+    return msg.strip().splitlines()[0][:300] if msg.strip() else e.__class__.__name__
+
+
+def _single(parsed: ParsedImport, cid: str) -> ParsedImport:
+    c = parsed.courses[cid]
+    return ParsedImport(
+        departments={c["department_id"]: parsed.departments[c["department_id"]]} if c["department_id"] in parsed.departments else {},
+        teachers={c["teacher_id"]: parsed.teachers[c["teacher_id"]]} if c["teacher_id"] in parsed.teachers else {},
+        courses={cid: c},
+        times={cid: parsed.times.get(cid, [])},
+    )
+
+
+def _keep_courses_together(chunks: Iterable[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """
+    每批最後一門課的列留到下一批，一門課的多個時段（連續幾列）不會被切到兩批
+    """
+    carry: Optional[pd.DataFrame] = None
+    for df in chunks:
+        df = df.loc[:, ~df.columns.duplicated()]
+        if carry is not None:
+            df = pd.concat([carry, df])
+            carry = None
+        ids = col_str(_col(df, "科目代碼(新碼全碼)"))
+        last = ids.iloc[-1] if len(ids) else None
+        if last is not None:
+            tail = (ids == last).to_numpy()
+            if not tail.all():
+                carry, df = df[tail], df[~tail]
+        yield df
+    if carry is not None:
+        yield carry
+
+
+def import_chunked(
+    db: Session,
+    chunks: Iterable[pd.DataFrame],
+    mode: ImportMode = "skip",
+    on_progress: Optional[Callable[[dict], None]] = None,
+) -> dict:
+    """
+    每批 parse + bulk_import 後就 commit；一批失敗時改逐門課（savepoint）重試，
+    壞掉的列記進錯誤報告，其他列照常寫入
+    - 整批之間以第一次出現的課號為準（和一次匯入相同）；同一門課的連續幾列一定在同一批，
+      隔了好幾批才又出現的課號無法補進時段，記進錯誤報告
+    - on_progress：每批 commit 後呼叫，參數是目前累計（rows / error_count / 各項筆數）
+    """
+    rows = 0
+    totals = {"inserted_courses": 0, "updated_courses": 0, "skipped_courses": 0, "inserted_times": 0}
+    errors: List[dict] = []
+    error_count = 0
+    seen: set = set()
+    chunk_count = 0
+
+    def report(row, course_id, message):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < settings.IMPORT_MAX_ERRORS:
+            errors.append({"row": row, "course_id": course_id, "error": message})
+
+    for df in _keep_courses_together(chunks):
+        chunk_count += 1
+
+        # 有內容但沒有課號的列
+        ids = col_str(_col(df, "科目代碼(新碼全碼)"))
+        non_blank = pd.concat([col_str(df[c]) for c in df.columns], axis=1).notna().any(axis=1)
+        for row in df.index[ids.isna() & non_blank]:
+            report(int(row), None, "缺少科目代碼")
+        row_of = {cid: int(row) for row, cid in ids.dropna()[~ids.dropna().duplicated()].items()}
+
+        parsed = parse_course_frame(df)
+        for cid in [c for c in parsed.courses if c in seen]:
+            report(row_of.get(cid), cid, "課號在前面的批次已匯入，這幾列略過")
+            del parsed.courses[cid]
+            parsed.times.pop(cid, None)
+        seen.update(parsed.courses)
+
+        try:
+            with db.begin_nested():
+                stats = bulk_import(db, parsed, mode)
+        except Exception:
+            stats = dict.fromkeys(totals, 0)
+            for cid in parsed.courses:
+                try:
+                    with db.begin_nested():
+                        one = bulk_import(db, _single(parsed, cid), mode)
+                except Exception as e:
+                    report(row_of.get(cid), cid, _db_error(e))
+                    continue
+                for k in stats:
+                    stats[k] += one[k]
+
+        db.commit()
+        rows += len(df)
+        for k in totals:
+            totals[k] += stats[k]
+        if on_progress is not None:
+            on_progress({"rows": rows, "error_count": error_count, **totals})
+
+    return {**totals, "rows": rows, "chunks": chunk_count, "error_count": error_count, "errors": errors}
@@ -0,0 +1,142 @@
+# app/utils/course_rows.py
+from itertools import groupby
+from typing import Iterable, Iterator, Dict, List, Tuple, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.course import Course
+from app.models.teacher import Teacher
+from app.models.department import Department
+from app.models.course_time import CourseTime
+from app.utils.course_filters import CourseFilters, export_stmt
+
+EXPORT_YIELD_PER = 500
+
+
+def load_course_times(db: Session, course_ids: List[str]) -> Dict[str, List[CourseTime]]:
+    """
+    只查「這一頁」課程的時段，依 (weekday, start_section) 排好
+    """
+    times_map: Dict[str, List[CourseTime]] = {}
+    if not course_ids:
+        return times_map
+
+    rows = (
+        db.query(CourseTime)
+        .filter(CourseTime.course_id.in_(course_ids))
+        .order_by(CourseTime.course_id, CourseTime.weekday, CourseTime.start_section)
+        .all()
+    )
+    for t in rows:
+        times_map.setdefault(t.course_id, []).append(t)
+    return times_map
+
+
+def load_course_rows(
+    db: Session, course_ids: List[str]
+) -> Dict[str, Tuple[Course, Optional[str], Optional[str], Optional[str]]]:
+    """
+    course_id -> (Course, teacher_name, department_id, department_name)
+    """
+    if not course_ids:
+        return {}
+
+    rows = (
+        db.query(
+            Course,
+            Teacher.name.label("teacher_name"),
+            Department.id.label("department_id"),
+            Department.name.label("department_name"),
+        )
+        .outerjoin(Teacher, Teacher.id == Course.teacher_id)
+        .outerjoin(Department, Department.id == Course.department_id)
+        .filter(Course.id.in_(course_ids))
+        .all()
+    )
+    return {r[0].id: tuple(r) for r in rows}
+
+
+def times_to_json(times: Iterable[CourseTime]) -> List[dict]:
+    return [
+        {
+            "weekday": t.weekday,
+            "start_section": t.start_section,
+            "end_section": t.end_section,
+            "classroom": t.classroom,
+        }
+        for t in times
+    ]
+
+
+def course_to_item(course: Course, teacher_name, dept_id, dept_name, times=None, **extra) -> dict:
+    """
+    課程列表共用的輸出格式；extra 會放在 times 前面（例如 is_favorite）
+    """
+    item = {
+        "id": course.id,
+        "name_zh": course.name_zh,
+        "name_en": course.name_en,
+        "semester": course.semester,
+        "grade": course.grade,
+        "required_type": course.required_type,
+        "category": course.category,
+
+        "department_id": dept_id,
+        "department_name": dept_name,
+
+        "teacher_id": course.teacher_id,
+        "teacher_name": teacher_name,
+        "credit": course.credit,
+        "class_group": course.class_group,
+        "group_code": course.group_code,
+        "limit_min": course.limit_min,
+        "limit_max": course.limit_max,
+        "raw_remark": course.raw_remark,
+    }
+    item.update(extra)
+    if times is not None:
+        item["times"] = times_to_json(times)
+    return item
+
+
+def build_course_items(db: Session, course_ids: List[str], extras: Optional[Dict[str, dict]] = None) -> List[dict]:
+    """
+    兩段式查詢的第二段：
+    已經拿到「這一頁」的 course_id（已排序），再補 teacher / department / times
+    固定 2 個 query，跟整個 course_time 表的大小無關
+    """
+    rows = load_course_rows(db, course_ids)
+    times_map = load_course_times(db, course_ids)
+
+    items = []
+    for cid in course_ids:
+        row = rows.get(cid)
+        if row is None:
+            continue
+        course, teacher_name, dept_id, dept_name = row
+        extra = (extras or {}).get(cid, {})
+        items.append(course_to_item(course, teacher_name, dept_id, dept_name, times_map.get(cid, []), **extra))
+    return items
+
+
+def iter_export_courses(
+    db: Session, filters: CourseFilters
+) -> Iterator[Tuple[Course, Optional[str], Optional[str], List[CourseTime]]]:
+    """
+    匯出用：server-side cursor（yield_per）一批批讀，時段在同一個查詢 join 進來，
+    依 course id 分組後逐門課 yield (Course, teacher_name, department_name, times)
+    不會一次載入全部課程，也沒有超大的 IN 清單
+    """
+    result = db.execute(
+        export_stmt(filters.shape),
+        filters.params(),
+        execution_options={"yield_per": EXPORT_YIELD_PER},
+    )
+    try:
+        for _cid, rows in groupby(result, key=lambda r: r[0].id):
+            course, teacher_name, dept_name, t = next(rows)
+            times = [t] if t is not None else []
+            times.extend(r[3] for r in rows if r[3] is not None)
+            yield course, teacher_name, dept_name, times
+    finally:
+        result.close()
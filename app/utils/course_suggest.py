@@ -0,0 +1,119 @@
+# app/utils/course_suggest.py
+"""
+/courses/suggest 用的記憶體 n-gram 索引（每個學期一份）
+
+- 從 catalog_snapshot 的課程快照建（課號、中文課名、英文課名、教師姓名）
+- 索引：單字 / 雙字 -> 條目位置；查詢時取最短的 posting list，再用子字串確認
+- 快照重建（版本號變了或 TTL 到）後，下一次查詢會跟著重建索引
+"""
+import heapq
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.utils.catalog_snapshot import CatalogSnapshot, get_snapshot
+
+
+def _grams(text: str) -> set:
+    out = set(text)
+    out.update(text[i:i + 2] for i in range(len(text) - 1))
+    return out
+
+
+class SuggestIndex:
+    def __init__(self, snap: CatalogSnapshot):
+        self.snap = snap
+        self.texts: List[str] = []
+        self.kinds: List[str] = []        # id / name_zh / name_en / teacher
+        self.refs: List[object] = []      # 課程：快照中的位置；教師：teacher_id
+        self.grams: Dict[str, array] = {}
+
+        for i in range(len(snap)):
+            self._add("id", snap.ids[i], i)
+            self._add("name_zh", snap.name_zh[i], i)
+            self._add("name_en", snap.name_en[i], i)
+
+        self.teacher_names: Dict[str, str] = {}
+        for tid, name in zip(snap.teacher_id, snap.teacher_name):
+            if tid and name and tid not in self.teacher_names:
+                self.teacher_names[tid] = name
+                self._add("teacher", name, tid)
+
+    def _add(self, kind: str, text: Optional[str], ref) -> None:
+        t = (text or "").strip().lower()
+        if not t:
+            return
+        e = len(self.texts)
+        self.texts.append(t)
+        self.kinds.append(kind)
+        self.refs.append(ref)
+        for g in _grams(t):
+            self.grams.setdefault(g, array("I")).append(e)
+
+    def search(self, q: str, limit: int = 10) -> List[dict]:
+        """
+        排序：完全相同 > 開頭相同 > 包含，再依字串長度（短的優先）；同一門課只出現一次
+        """
+        q = q.strip().lower()
+        if not q:
+            return []
+        keys = {q} if len(q) == 1 else {q[i:i + 2] for i in range(len(q) - 1)}
+        postings = [self.grams.get(g) for g in keys]
+        if any(p is None for p in postings):
+            return []
+
+        scored = []
+        for e in min(postings, key=len):
+            t = self.texts[e]
+            pos = t.find(q)
+            if pos < 0:
+                continue
+            rank = 0 if t == q else (1 if pos == 0 else 2)
+            scored.append((rank, len(t), t, e))
+
+        out, seen = [], set()
+        for _rank, _n, _t, e in heapq.nsmallest(limit * 3, scored):
+            kind, ref = self.kinds[e], self.refs[e]
+            key = (kind == "teacher", ref)
+            if key in seen:
+                continue
+            seen.add(key)
+            out.append(self._item(kind, ref))
+            if len(out) >= limit:
+                break
+        return out
+
+    def _item(self, kind: str, ref) -> dict:
+        if kind == "teacher":
+            return {"type": "teacher", "id": ref, "name": self.teacher_names[ref]}
+        s = self.snap
+        return {
+            "type": "course",
+            "id": s.ids[ref],
+            "name_zh": s.name_zh[ref],
+            "name_en": s.name_en[ref],
+            "teacher_name": s.teacher_name[ref],
+            "matched": kind,
+        }
+
+
+_indexes: Dict[str, SuggestIndex] = {}
+_lock = threading.Lock()
+
+
+def get_suggest_index(db: Session, semester: str) -> SuggestIndex:
+    snap = get_snapshot(db, semester)
+    if len(snap) == 0:
+        # 不存在的學期：空索引，不放進 _indexes
+        return SuggestIndex(snap)
+    idx = _indexes.get(semester)
+    if idx is not None and idx.snap is snap:
+        return idx
+    with _lock:
+        idx = _indexes.get(semester)
+        if idx is None or idx.snap is not snap:
+            idx = SuggestIndex(snap)
+            _indexes[semester] = idx
+        return idx
@@ -0,0 +1,23 @@
+import base64
+import json
+
+from fastapi import HTTPException
+
+
+def encode_cursor(key: dict) -> str:
+    """
+    {"id": "A123"} -> 不透明字串（urlsafe base64，無 padding）
+    """
+    raw = json.dumps(key, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(key, dict) or not isinstance(key.get("id"), str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return key
@@ -1,57 +1,148 @@
-
 from __future__ import annotations
-from typing import Iterable, List, Dict, Any
-from io import BytesIO
+from typing import Iterable, Iterator, List, Dict, Any, Optional, Sequence
+from itertools import islice
+from tempfile import SpooledTemporaryFile
 from datetime import datetime
 
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.utils import get_column_letter
 from openpyxl.styles import Font, Alignment
 
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# ===== 匯出欄位：對齊 import 讀取的 header =====
+COURSE_EXPORT_HEADERS = [
+    "系所代碼", "主開課教師代碼(舊碼)", "主開課教師姓名", "授課教師代碼(舊碼)", "授課教師姓名",
+    "科目代碼(新碼全碼)", "科目中文名稱", "科目英文名稱",
+    "年級", "上課班組", "科目組別",
+    "學分數", "課別名稱", "課別代碼", "上課人數",
+    "課程中文摘要", "課程英文摘要", "課表備註", "學期",
+    "上課星期", "上課節次", "上課地點",
+]
+
+# write-only 模式的欄寬要在寫第一列之前設定，所以先暫存前面幾列來估欄寬
+WIDTH_SAMPLE_ROWS = 1000
+MAX_COL_WIDTH = 60
+STREAM_CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_SIZE = 8 * 1024 * 1024   # 超過就落到暫存檔
+
+
+def format_sections(start, end) -> Optional[str]:
+    # 上課節次：單節就輸出 "3"，多節就輸出 "3-5"
+    if start is None:
+        return None
+    if start == end or end is None:
+        return str(start)
+    return f"{start}-{end}"
+
+
+def course_export_row(course, teacher_name, time) -> list:
+    """
+    一門課 -> 一列（順序同 COURSE_EXPORT_HEADERS）；time 是要輸出的那一筆 CourseTime（可為 None）
+    """
+    return [
+        course.department_id,
+        course.teacher_id,
+        teacher_name or "",
+        course.teacher_id,
+        teacher_name or "",
+
+        course.id,
+        course.name_zh or "",
+        course.name_en or "",
+
+        course.grade,
+        course.class_group or "",
+        course.group_code or "",
+
+        course.credit,
+        course.required_type or "",
+        course.category or "",
+        course.limit_max,
+
+        course.chinese_summary or "",
+        course.english_summary or "",
+        course.raw_remark or "",
+        course.semester or "",
+
+        time.weekday if time is not None else None,
+        format_sections(time.start_section, time.end_section) if time is not None else None,
+        (time.classroom or "") if time is not None else "",
+    ]
+
+
+def write_xlsx(headers: Sequence[str], rows: Iterable[Sequence[Any]], sheet_name: str = "Courses"):
+    """
+    write-only workbook，一次走過 rows 就寫完；回傳已 seek(0) 的 SpooledTemporaryFile
+    - 欄寬：表頭 + 前 WIDTH_SAMPLE_ROWS 列邊寫邊算（write-only 不能寫完再回頭改）
+    - 列資料不會整批留在記憶體，openpyxl 本身也是邊 append 邊寫到暫存檔
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title=sheet_name[:31])
+
+    it = iter(rows)
+    head = list(islice(it, WIDTH_SAMPLE_ROWS))
+
+    if not head:
+        ws.append(["No data"])
+    else:
+        widths = [len(str(h)) for h in headers]
+        for r in head:
+            for i, v in enumerate(r):
+                if v is not None:
+                    n = len(str(v))
+                    if n > widths[i]:
+                        widths[i] = n
+        for i, w in enumerate(widths, start=1):
+            ws.column_dimensions[get_column_letter(i)].width = min(w + 2, MAX_COL_WIDTH)
+
+        # header style
+        header_font = Font(bold=True)
+        header_align = Alignment(horizontal="center", vertical="center")
+        header_cells = []
+        for h in headers:
+            cell = WriteOnlyCell(ws, value=h)
+            cell.font = header_font
+            cell.alignment = header_align
+            header_cells.append(cell)
+        ws.append(header_cells)
+
+        for r in head:
+            ws.append(list(r))
+        for r in it:
+            ws.append(list(r))
+
+    out = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    wb.save(out)
+    out.seek(0)
+    return out
+
+
+def iter_file(f, chunk_size: int = STREAM_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    給 StreamingResponse 用：分段讀出，讀完關檔
+    """
+    try:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        f.close()
+
 
 def courses_to_xlsx_bytes(rows: List[Dict[str, Any]], sheet_name: str = "Courses") -> bytes:
     """
     rows: list of dict, each dict is a row
     """
-    wb = Workbook()
-    ws = wb.active
-    ws.title = sheet_name[:31]
+    headers = list(rows[0].keys()) if rows else []
+    f = write_xlsx(headers, ([r.get(h) for h in headers] for r in rows), sheet_name=sheet_name)
+    with f:
+        return f.read()
 
-    if not rows:
-        ws.append(["No data"])
-        buf = BytesIO()
-        wb.save(buf)
-        return buf.getvalue()
-
-    headers = list(rows[0].keys())
-    ws.append(headers)
-
-    # header style
-    header_font = Font(bold=True)
-    for col_idx, _h in enumerate(headers, start=1):
-        cell = ws.cell(row=1, column=col_idx)
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-
-    # data
-    for r in rows:
-        ws.append([r.get(h) for h in headers])
-
-    # autosize columns
-    for col_idx, h in enumerate(headers, start=1):
-        max_len = len(str(h))
-        for row_idx in range(2, ws.max_row + 1):
-            v = ws.cell(row=row_idx, column=col_idx).value
-            if v is None:
-                continue
-            max_len = max(max_len, len(str(v)))
-        ws.column_dimensions[get_column_letter(col_idx)].width = min(max_len + 2, 60)
-
-    buf = BytesIO()
-    wb.save(buf)
-    return buf.getvalue()
-
-
-def make_filename(prefix: str = "courses") -> str:
+
+def make_filename(prefix: str = "courses", ext: str = "xlsx") -> str:
     ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return f"{prefix}_{ts}.xlsx"
+    return f"{prefix}_{ts}.{ext}"
@@ -0,0 +1,66 @@
+# app/utils/export_jobs.py
+"""
+/courses/export/jobs：背景產生匯出檔
+
+- 同一組 (catalog 版本, 篩選條件, 格式) 進行中或完成不到 EXPORT_JOB_REUSE_TTL 秒的工作直接重用；
+  catalog 版本只在本 worker 內有效（其他 worker 的匯入 / 修改看不到），所以重用時間另外限制，
+  檔案本身仍保留 EXPORT_JOB_TTL 秒供下載
+- 產出的檔案放在 EXPORT_JOB_DIR（預設系統暫存目錄），工作過期時刪除
+- 排隊 + 執行中的工作最多 EXPORT_JOB_MAX_PENDING 個，超過回 503；建立工作要登入
+"""
+import os
+import shutil
+import tempfile
+
+from app.config import settings
+from app.database import SessionLocal
+from app.utils.catalog_version import get_catalog_version
+from app.utils.course_export import ExportFormat, iter_export_course_rows, iter_export_stream, write_export_file
+from app.utils.course_filters import CourseFilters
+from app.utils.jobs import Job, JobRunner
+from app.utils.search_count import exact_count
+
+
+def _remove_artifact(job: Job) -> None:
+    if job.result and os.path.exists(job.result["path"]):
+        os.remove(job.result["path"])
+
+
+export_runner = JobRunner(
+    "export",
+    max_workers=settings.EXPORT_JOB_WORKERS,
+    ttl=settings.EXPORT_JOB_TTL,
+    on_expire=_remove_artifact,
+    reuse_ttl=settings.EXPORT_JOB_REUSE_TTL,
+    max_pending=settings.EXPORT_JOB_MAX_PENDING,
+)
+
+
+def _run_export(job: Job, filters: CourseFilters, fmt: ExportFormat) -> dict:
+    fd, path = tempfile.mkstemp(prefix="courses_", suffix=f".{fmt}", dir=settings.EXPORT_JOB_DIR or None)
+    db = SessionLocal()
+    try:
+        with os.fdopen(fd, "wb") as out:
+            job.total = exact_count(db, filters)
+            # progress 以課程計（total 是課程數；多時段的課會有好幾列）
+            rows = (r for rs in job.track(iter_export_course_rows(filters, db)) for r in rs)
+            if fmt in ("csv", "ndjson"):
+                for chunk in iter_export_stream(fmt, rows):
+                    out.write(chunk)
+            else:
+                with write_export_file(fmt, rows) as f:
+                    shutil.copyfileobj(f, out)
+    except Exception:
+        os.remove(path)
+        raise
+    finally:
+        db.close()
+    return {"path": path, "format": fmt, "size": os.path.getsize(path)}
+
+
+def submit_export(filters: CourseFilters, fmt: ExportFormat):
+    """
+    回傳 (job, reused)
+    """
+    key = (get_catalog_version(), filters, fmt)
+    return export_runner.submit("course_export", _run_export, filters, fmt, key=key)
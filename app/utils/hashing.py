@@ -1,7 +1,15 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
 
 from passlib.context import CryptContext
 from fastapi import HTTPException
 
+from app.config import settings
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 def _check_bcrypt_len(password: str):
@@ -15,3 +23,117 @@ def hash_password(password: str):
 def verify_password(plain_password: str, hashed_password: str):
     _check_bcrypt_len(plain_password)
     return pwd_context.verify(plain_password, hashed_password)
+
+
+# ---------- async 版：bcrypt 丟到專用 executor，不佔 Starlette 的 thread pool ----------
+# PASSWORD_HASH_EXECUTOR=thread（bcrypt 計算時會放掉 GIL）或 process；
+# 同時最多 PASSWORD_HASH_WORKERS 個在算，再多 PASSWORD_HASH_MAX_QUEUE 個排隊，超過直接 503
+
+
+def _timed(fn, *args):
+    # 在 worker 裡跑：回傳 (結果, 開始時間, 執行秒數)，排隊時間由呼叫端用開始時間算
+    started = time.time()
+    result = fn(*args)
+    return result, started, time.time() - started
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class _HashPool:
+    def __init__(self, kind: str, workers: int, max_queue: int):
+        self.kind = kind
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.run_total = 0.0
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+            return self._executor
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.workers + self.max_queue:
+                self.rejected += 1
+                raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+        submitted = time.time()
+        try:
+            fut = self._get_executor().submit(_timed, fn, *args)
+        except BaseException:
+            with self._lock:
+                self.in_flight -= 1
+            raise
+        # 名額在 executor 裡的工作真正結束（或排隊中被取消）時才還：
+        # request 被取消（client 斷線）時 bcrypt 可能還在算，不能提早讓新的請求進來
+        fut.add_done_callback(lambda f: self._done(f, submitted))
+        result, _, _ = await asyncio.wrap_future(fut)
+        return result
+
+    def _done(self, fut, submitted: float) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if fut.cancelled() or fut.exception() is not None:
+                return
+            _, started, elapsed = fut.result()
+            wait = max(started - submitted, 0.0)
+            self.completed += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.run_total += elapsed
+
+    def stats(self) -> dict:
+        with self._lock:
+            n = self.completed
+            return {
+                "executor": self.kind,
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self.in_flight,
+                "queued": max(self.in_flight - self.workers, 0),
+                "peak_in_flight": self.peak_in_flight,
+                "completed": n,
+                "rejected": self.rejected,
+                "avg_wait_ms": round(self.wait_total / n * 1000, 1) if n else 0.0,
+                "max_wait_ms": round(self.wait_max * 1000, 1),
+                "avg_run_ms": round(self.run_total / n * 1000, 1) if n else 0.0,
+            }
+
+
+_pool = _HashPool(settings.PASSWORD_HASH_EXECUTOR, settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
+
+
+async def hash_password_async(password: str) -> str:
+    _check_bcrypt_len(password)
+    return await _pool.run(_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    _check_bcrypt_len(plain_password)
+    return await _pool.run(_verify, plain_password, hashed_password)
+
+
+def password_hash_stats() -> dict:
+    return _pool.stats()
@@ -0,0 +1,164 @@
+# app/utils/import_jobs.py
+"""
+/admin/import/jobs：背景匯入課表
+
+- 上傳檔先存到 IMPORT_JOB_DIR（預設系統暫存目錄），工作結束就刪；可一次上傳多個檔案
+- 同一個學期的匯入一次只跑一個：用 Postgres advisory lock（多個 worker / process 也有效）
+- 進度：phase + progress / total（每個階段重新計），rows_parsed / rows_written / error_count / errors；
+  eta_seconds 由 Job 依這個階段的速度估計
+  - chunked：scanning -> waiting_lock -> importing（progress = 已寫入的列數）
+  - 一般：parsing（progress = 解析完的工作表數）-> waiting_lock -> writing_courses（處理過的課程數）
+    -> writing_times（寫入的時段數）
+"""
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from fastapi import UploadFile
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.database import SessionLocal, engine
+from app.utils.catalog_version import bump_catalog_version
+from app.utils.course_import import (
+    ImportMode, bulk_import, import_chunked, iter_sheet_chunks, parse_course_files, scan_sheet,
+)
+from app.utils.jobs import Job, JobRunner
+
+logger = logging.getLogger("app.import")
+
+import_runner = JobRunner(
+    "import",
+    max_workers=settings.IMPORT_JOB_WORKERS,
+    ttl=settings.IMPORT_JOB_TTL,
+)
+
+
+@contextmanager
+def semester_lock(semesters: Iterable[str], job: Optional[Job] = None):
+    """
+    依學期排序逐一拿 pg_advisory_lock（固定順序，不會互相卡死）；
+    用獨立連線拿 session 層級的鎖，中間 Session commit 歸還連線也不會放掉
+    """
+    keys = sorted(set(semesters))
+    if job is not None:
+        job.info["phase"] = "waiting_lock"
+    conn = engine.connect()
+    try:
+        for s in keys:
+            conn.execute(select(func.pg_advisory_lock(func.hashtext("course_import:" + s))))
+        conn.commit()
+        yield
+    finally:
+        try:
+            conn.execute(select(func.pg_advisory_unlock_all()))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def save_upload(file: UploadFile) -> str:
+    suffix = Path(file.filename or "").suffix.lower()
+    fd, path = tempfile.mkstemp(prefix="import_", suffix=suffix, dir=settings.IMPORT_JOB_DIR or None)
+    with os.fdopen(fd, "wb") as out:
+        shutil.copyfileobj(file.file, out)
+    return path
+
+
+def save_uploads(files: List[UploadFile]) -> List[Tuple[str, str]]:
+    """
+    回傳 [(暫存檔路徑, 原始檔名)]；中途失敗會把已存的刪掉
+    """
+    saved: List[Tuple[str, str]] = []
+    try:
+        for f in files:
+            saved.append((save_upload(f), f.filename or ""))
+    except Exception:
+        remove_uploads(saved)
+        raise
+    return saved
+
+
+def remove_uploads(saved: List[Tuple[str, str]]) -> None:
+    for path, _ in saved:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _run_import(job: Job, files: List[Tuple[str, str]], mode: ImportMode, chunked: bool) -> dict:
+    db = SessionLocal()
+    info = job.info
+    info.update({"rows_parsed": 0, "rows_written": 0, "error_count": 0, "errors": []})
+    try:
+        if chunked:
+            path = files[0][0]
+            job.start_phase("scanning")
+            semesters, total = scan_sheet(path, settings.IMPORT_CHUNK_ROWS)
+            info["rows_parsed"] = total
+            info["semesters"] = semesters
+
+            def progress(p: dict) -> None:
+                job.progress = info["rows_written"] = p["rows"]
+                info["error_count"] = p["error_count"]
+
+            with semester_lock(semesters, job):
+                job.start_phase("importing", total)
+                try:
+                    stats = import_chunked(
+                        db, iter_sheet_chunks(path, settings.IMPORT_CHUNK_ROWS), mode, on_progress=progress,
+                    )
+                finally:
+                    # 中途失敗時，前面已 commit 的批次也要讓快取失效
+                    if info["rows_written"]:
+                        bump_catalog_version("courses imported (job)")
+            info["errors"] = stats["errors"]
+        else:
+            job.start_phase("parsing")
+
+            def parse_progress(done: int, total: int) -> None:
+                job.total, job.progress = total, done
+
+            parsed = parse_course_files(files, on_progress=parse_progress)
+            info["rows_parsed"] = parsed.rows
+            semesters = sorted({c["semester"] for c in parsed.courses.values() if c["semester"]})
+            info["semesters"] = semesters
+
+            def write_progress(step: str, done: int, total: int) -> None:
+                if info.get("phase") != f"writing_{step}":
+                    job.start_phase(f"writing_{step}", total)
+                job.progress = done
+
+            with semester_lock(semesters, job):
+                # 系所 / 教師也算在 writing_courses 裡（量少，不另外計）
+                job.start_phase("writing_courses", len(parsed.courses))
+                stats = bulk_import(db, parsed, mode, on_progress=write_progress)
+                db.commit()
+            info["rows_written"] = parsed.rows
+            bump_catalog_version("courses imported (job)")
+
+        info["phase"] = "done"
+        return stats
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+        remove_uploads(files)
+
+
+def submit_import(uploads: List[UploadFile], mode: ImportMode, chunked: bool) -> Job:
+    files = save_uploads(uploads)
+    try:
+        job, _ = import_runner.submit("course_import", _run_import, files, mode, chunked)
+    except Exception:
+        remove_uploads(files)
+        raise
+    logger.info(
+        "import job %s queued (%s, mode=%s, chunked=%s)",
+        job.id, ", ".join(name for _, name in files), mode, chunked,
+    )
+    return job
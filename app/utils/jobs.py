@@ -0,0 +1,177 @@
+# app/utils/jobs.py
+"""
+process 內的背景工作（匯出 / 匯入等耗時作業）
+
+- JobRunner：固定大小的 thread pool + 工作登記表；同一個 key 進行中或已完成的工作直接重用
+  （有設 reuse_ttl 時，完成超過 reuse_ttl 秒的工作不再重用，但仍可用 id 查詢 / 下載）
+- 完成的工作保留 ttl 秒，過期時呼叫 on_expire（例如刪掉產出的檔案）
+- max_pending：排隊 + 執行中的工作上限，超過直接 503（thread pool 的佇列本身沒有上限）
+- 只存在目前這個 process；多個 worker 時，查詢要打到同一個 worker（或前面加 sticky session）
+"""
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, Iterator, Optional, Tuple
+
+from fastapi import HTTPException
+
+logger = logging.getLogger("app.jobs")
+
+
+class Job:
+    def __init__(self, kind: str, key: Optional[Hashable] = None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = "pending"          # pending / running / done / failed
+        self.progress = 0
+        self.total: Optional[int] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.info: Dict[str, Any] = {}       # 各種工作自己的進度資訊（to_dict 一起輸出）
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.phase_started_at: Optional[float] = None
+
+    def start_phase(self, phase: str, total: Optional[int] = None) -> None:
+        """
+        進入新階段（info["phase"]）：progress 歸零、total 換成這個階段的，eta 從這裡重新算
+        """
+        self.info["phase"] = phase
+        self.progress = 0
+        self.total = total
+        self.phase_started_at = time.time()
+
+    def track(self, items: Iterable) -> Iterator:
+        """
+        包住 iterator，每取一筆 progress +1
+        """
+        for x in items:
+            self.progress += 1
+            yield x
+
+    def eta(self) -> Optional[float]:
+        """
+        依目前速度估計剩餘秒數；還沒開始 / 不知道總數時 None
+        """
+        if self.status != "running" or not self.total or not self.progress or self.started_at is None:
+            return None
+        elapsed = time.time() - (self.phase_started_at or self.started_at)
+        return round(elapsed / self.progress * max(self.total - self.progress, 0), 1)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "total": self.total,
+            "eta_seconds": self.eta(),
+            **self.info,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobRunner:
+    def __init__(
+        self,
+        name: str,
+        max_workers: int = 2,
+        ttl: float = 3600,
+        on_expire: Optional[Callable[[Job], None]] = None,
+        reuse_ttl: Optional[float] = None,
+        max_pending: Optional[int] = None,
+    ):
+        self.name = name
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.reuse_ttl = reuse_ttl
+        self.on_expire = on_expire
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._jobs: Dict[str, Job] = {}
+        self._by_key: Dict[Hashable, str] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args, key: Optional[Hashable] = None) -> Tuple[Job, bool]:
+        """
+        回傳 (job, reused)；fn(job, *args) 的回傳值放進 job.result
+        未完成的工作已達 max_pending 時 503（可重用的工作照樣回傳）
+        """
+        self.prune()
+        with self._lock:
+            if key is not None:
+                existing = self._jobs.get(self._by_key.get(key, ""))
+                if existing is not None and self._reusable(existing):
+                    return existing, True
+
+            if self.max_pending is not None and self._pending() >= self.max_pending:
+                raise HTTPException(
+                    status_code=503, detail="Too many jobs in progress, please retry later",
+                    headers={"Retry-After": "5"},
+                )
+
+            job = Job(kind, key)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._by_key[key] = job.id
+
+        self._pool.submit(self._run, job, fn, args)
+        return job, False
+
+    def _pending(self) -> int:
+        # 呼叫端要拿著 _lock
+        return sum(1 for j in self._jobs.values() if j.finished_at is None)
+
+    def _reusable(self, job: Job) -> bool:
+        if job.status == "failed":
+            return False
+        if self.reuse_ttl is None or job.finished_at is None:
+            return True
+        return time.time() - job.finished_at <= self.reuse_ttl
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        started = time.perf_counter()
+        try:
+            job.result = fn(job, *args)
+            job.status = "done"
+        except Exception as e:
+            logger.exception("%s job %s failed", self.name, job.id)
+            job.error = str(e) or e.__class__.__name__
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+            logger.info(
+                "%s job %s %s (%d items, %dms)",
+                self.name, job.id, job.status, job.progress, int((time.perf_counter() - started) * 1000),
+            )
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.prune()
+        return self._jobs.get(job_id)
+
+    def prune(self) -> None:
+        now = time.time()
+        with self._lock:
+            expired = [
+                j for j in self._jobs.values()
+                if j.finished_at is not None and now - j.finished_at > self.ttl
+            ]
+            for j in expired:
+                del self._jobs[j.id]
+                if j.key is not None and self._by_key.get(j.key) == j.id:
+                    del self._by_key[j.key]
+
+        for j in expired:
+            if self.on_expire is not None:
+                try:
+                    self.on_expire(j)
+                except Exception:
+                    logger.exception("%s job %s cleanup failed", self.name, j.id)
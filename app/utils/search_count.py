@@ -0,0 +1,58 @@
+import json
+from typing import Literal, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.config import settings
+from app.utils.cache import TTLCache
+from app.utils.catalog_version import get_catalog_version
+from app.utils.course_filters import CourseFilters, count_stmt, ids_stmt
+
+CountMode = Literal["exact", "estimated", "auto"]
+
+_count_cache = TTLCache(maxsize=settings.SEARCH_COUNT_CACHE_SIZE, ttl=settings.SEARCH_COUNT_CACHE_TTL)
+
+
+def estimate_count(db: Session, filters: CourseFilters) -> int:
+    """
+    用 planner 的估計筆數（EXPLAIN），不真的掃資料
+    """
+    compiled = ids_stmt(filters.shape).compile(
+        dialect=db.get_bind().dialect,
+        compile_kwargs={"render_postcompile": True},
+    )
+    params = compiled.construct_params(filters.params())
+    plan = db.connection().exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def exact_count(db: Session, filters: CourseFilters) -> int:
+    return db.execute(count_stmt(filters.shape), filters.params()).scalar_one()
+
+
+def cached_count(db: Session, filters: CourseFilters, mode: CountMode = "exact") -> Tuple[int, bool]:
+    """
+    回傳 (total, is_estimate)
+    - exact：count(*)
+    - estimated：EXPLAIN 估計值
+    - auto：估計值超過門檻（很寬的查詢）就用估計值，否則精確 count
+    結果依 (catalog 版本, 篩選條件, mode) 快取；admin 改課程後版本號變了就不會再命中
+    """
+    key = (get_catalog_version(), filters, mode)
+    hit = _count_cache.get(key)
+    if hit is not None:
+        return hit
+
+    if mode == "exact":
+        result = (exact_count(db, filters), False)
+    else:
+        estimate = estimate_count(db, filters)
+        if mode == "estimated" or estimate >= settings.SEARCH_COUNT_ESTIMATE_THRESHOLD:
+            result = (estimate, True)
+        else:
+            result = (exact_count(db, filters), False)
+
+    _count_cache.set(key, result)
+    return result
@@ -47,3 +47,53 @@ def compress_slots_to_ranges(slots: List[Tuple[int, int]]):
             start = end = s
     ranges.append((cur_w, start, end))
     return ranges
+
+
+# ===== 每門課的「星期 x 節次」佔用 bitmask（courses.time_mask, BIT(140)） =====
+# 第 (weekday - 1) * 20 + (section - 1) 個 bit 代表 星期 weekday 第 section 節
+SLOT_DAYS = 7
+SLOT_SECTIONS = 20
+SLOT_BITS = SLOT_DAYS * SLOT_SECTIONS
+FULL_MASK = (1 << SLOT_BITS) - 1
+
+
+def slot_bit(weekday: int, section: int) -> int:
+    return 1 << ((weekday - 1) * SLOT_SECTIONS + (section - 1))
+
+
+def slots_to_mask(slots: List[Tuple[int, int]]) -> int:
+    """
+    [(1,1),(3,5)] -> int mask
+    """
+    mask = 0
+    for w, sec in slots:
+        if 1 <= w <= SLOT_DAYS and 1 <= sec <= SLOT_SECTIONS:
+            mask |= slot_bit(w, sec)
+    return mask
+
+
+def ranges_to_mask(ranges) -> int:
+    """
+    [(weekday, start, end), ...] -> int mask（超出 7 x 20 的部分忽略）
+    """
+    mask = 0
+    for w, start, end in ranges:
+        if w is None or start is None or end is None:
+            continue
+        for sec in range(max(start, 1), min(end, SLOT_SECTIONS) + 1):
+            if 1 <= w <= SLOT_DAYS:
+                mask |= slot_bit(w, sec)
+    return mask
+
+
+def mask_to_bits(mask: int) -> str:
+    """
+    int mask -> BIT(140) 的字串表示，第 i 個字元是第 i 個 bit
+    """
+    return "".join("1" if mask >> i & 1 else "0" for i in range(SLOT_BITS))
+
+
+def bits_to_mask(bits: str | None) -> int:
+    if not bits:
+        return 0
+    return sum(1 << i for i, ch in enumerate(bits) if ch == "1")
@@ -0,0 +1,86 @@
+"""
+/admin/import 寫入方式比較（10k 列假課表，跑完 rollback，不會留下資料）
+
+before: 每個系所 / 教師 / 課程各一個 SELECT 檢查存在 + 逐筆 db.add
+after : course_import.bulk_import（每張表一個查詢拿既有 key + 批次 INSERT ... ON CONFLICT）
+
+用法（讀 .env 的 DB 設定）:
+    python -m bench.bench_course_import --rows 10000
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from app.database import SessionLocal
+from app.models.course import Course
+from app.models.teacher import Teacher
+from app.models.department import Department
+from app.models.course_time import CourseTime
+from app.utils.course_import import parse_course_frame, bulk_import
+
+
+def fake_frame(n: int) -> pd.DataFrame:
+    rows = []
+    for i in range(n):
+        rows.append({
+            "系所代碼": f"BD{i % 40:03d}",
+            "主開課教師代碼(舊碼)": f"BT{i % 800:04d}",
+            "主開課教師姓名": f"教師{i % 800}",
+            "科目代碼(新碼全碼)": f"BENCH{i:07d}",
+            "科目中文名稱": f"測試課程 {i}",
+            "科目英文名稱": f"Bench Course {i}",
+            "年級": i % 4 + 1,
+            "學分數": 3,
+            "課別名稱": "專業必修(系所)",
+            "課別代碼": "1",
+            "上課人數": 60,
+            "學期": "BENCH",
+            "上課星期": i % 5 + 1,
+            "上課節次": "3,4",
+            "上課地點": "B101",
+        })
+    return pd.DataFrame(rows)
+
+
+def import_before(db, parsed):
+    for dept_id in parsed.departments:
+        if not db.query(Department.id).filter(Department.id == dept_id).first():
+            db.add(Department(id=dept_id, name=""))
+    for tid, tname in parsed.teachers.items():
+        if not db.query(Teacher.id).filter(Teacher.id == tid).first():
+            db.add(Teacher(id=tid, name=tname))
+    db.flush()
+    for cid, data in parsed.courses.items():
+        if db.query(Course.id).filter(Course.id == cid).first():
+            continue
+        db.add(Course(**data))
+        for t in parsed.times.get(cid, []):
+            db.add(CourseTime(**t))
+    db.flush()
+
+
+def import_after(db, parsed):
+    bulk_import(db, parsed, "skip")
+    db.flush()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10000)
+    args = ap.parse_args()
+
+    parsed = parse_course_frame(fake_frame(args.rows))
+    for name, fn in (("before", import_before), ("after", import_after)):
+        db = SessionLocal()
+        try:
+            t0 = time.perf_counter()
+            fn(db, parsed)
+            print(f"{name:<7} rows={args.rows} {time.perf_counter() - t0:.2f}s")
+        finally:
+            db.rollback()
+            db.close()
+
+
+if __name__ == "__main__":
+    main()
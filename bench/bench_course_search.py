@@ -0,0 +1,99 @@
+"""
+課程搜尋 before/after 效能比較（p50 / p99）
+
+before: jsonb_agg 聚合整張 course_time 後 outer join，再 OFFSET/LIMIT
+after : 先查這一頁的 course_id，再只針對這些 id 補 teacher / department / times
+
+用法（讀 .env 的 DB 設定）:
+    python -m bench.bench_course_search --semester 1141 --runs 200 --page-size 50
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import func, cast, tuple_
+from sqlalchemy.dialects.postgresql import JSONB, aggregate_order_by
+
+from app.database import SessionLocal
+from app.models.course import Course
+from app.models.teacher import Teacher
+from app.models.department import Department
+from app.models.course_time import CourseTime
+from app.utils.course_rows import build_course_items
+
+
+def search_before(db, semester, page, page_size):
+    times_sq = (
+        db.query(
+            CourseTime.course_id.label("cid"),
+            func.coalesce(
+                func.jsonb_agg(
+                    aggregate_order_by(
+                        func.jsonb_build_object(
+                            "weekday", CourseTime.weekday,
+                            "start_section", CourseTime.start_section,
+                            "end_section", CourseTime.end_section,
+                            "classroom", CourseTime.classroom,
+                        ),
+                        tuple_(CourseTime.weekday, CourseTime.start_section),
+                    )
+                ),
+                cast("[]", JSONB),
+            ).label("times"),
+        )
+        .group_by(CourseTime.course_id)
+        .subquery()
+    )
+    q = (
+        db.query(Course, Teacher.name, Department.id, Department.name, times_sq.c.times)
+        .outerjoin(Teacher, Teacher.id == Course.teacher_id)
+        .outerjoin(Department, Department.id == Course.department_id)
+        .outerjoin(times_sq, times_sq.c.cid == Course.id)
+    )
+    if semester:
+        q = q.filter(Course.semester == semester)
+    q.count()
+    return q.order_by(Course.id.asc()).offset((page - 1) * page_size).limit(page_size).all()
+
+
+def search_after(db, semester, page, page_size):
+    q = db.query(Course.id)
+    if semester:
+        q = q.filter(Course.semester == semester)
+    q.count()
+    rows = q.order_by(Course.id.asc()).offset((page - 1) * page_size).limit(page_size).all()
+    return build_course_items(db, [r[0] for r in rows])
+
+
+def run(fn, args):
+    samples = []
+    db = SessionLocal()
+    try:
+        for i in range(args.runs):
+            page = 1 + (i % args.pages)
+            start = time.perf_counter()
+            fn(db, args.semester, page, args.page_size)
+            samples.append((time.perf_counter() - start) * 1000)
+            db.expunge_all()
+    finally:
+        db.close()
+    samples.sort()
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    return statistics.median(samples), p99
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--semester", default=None)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--pages", type=int, default=10, help="輪流查第 1..N 頁")
+    parser.add_argument("--page-size", type=int, default=50)
+    args = parser.parse_args()
+
+    for name, fn in (("before", search_before), ("after", search_after)):
+        p50, p99 = run(fn, args)
+        print(f"{name:>6}: p50={p50:.2f}ms p99={p99:.2f}ms (runs={args.runs}, page_size={args.page_size})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+課程 Excel 匯出的記憶體峰值比較（tracemalloc，不連 DB，用假資料）
+
+before: 一般 Workbook 全部放記憶體 + 逐格 ws.cell() 算欄寬 + BytesIO
+after : write-only Workbook 單次 append + SpooledTemporaryFile 分段讀出
+
+用法:
+    python -m bench.bench_excel_export --rows 5000
+"""
+import argparse
+import time
+import tracemalloc
+from io import BytesIO
+
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+from openpyxl.styles import Font, Alignment
+
+from app.utils.excel_export import COURSE_EXPORT_HEADERS, write_xlsx, iter_file
+
+
+def fake_rows(n):
+    for i in range(n):
+        yield [
+            "CS", f"T{i % 300:04d}", "王小明", f"T{i % 300:04d}", "王小明",
+            f"C{i:08d}", f"資料結構與演算法 {i}", f"Data Structures and Algorithms {i}",
+            i % 4 + 1, "A", "", 3, "專業必修(系所)", "1", 60,
+            "本課程介紹基本資料結構" * 8, "This course introduces basic data structures. " * 6,
+            "", "1141", i % 5 + 1, "3-4", "資工館 101",
+        ]
+
+
+def before(n):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(COURSE_EXPORT_HEADERS)
+    for col_idx in range(1, len(COURSE_EXPORT_HEADERS) + 1):
+        cell = ws.cell(row=1, column=col_idx)
+        cell.font = Font(bold=True)
+        cell.alignment = Alignment(horizontal="center", vertical="center")
+    for r in fake_rows(n):
+        ws.append(r)
+    for col_idx, h in enumerate(COURSE_EXPORT_HEADERS, start=1):
+        max_len = len(str(h))
+        for row_idx in range(2, ws.max_row + 1):
+            v = ws.cell(row=row_idx, column=col_idx).value
+            if v is not None:
+                max_len = max(max_len, len(str(v)))
+        ws.column_dimensions[get_column_letter(col_idx)].width = min(max_len + 2, 60)
+    buf = BytesIO()
+    wb.save(buf)
+    data = buf.getvalue()
+    return len(data)
+
+
+def after(n):
+    f = write_xlsx(COURSE_EXPORT_HEADERS, fake_rows(n))
+    return sum(len(c) for c in iter_file(f))
+
+
+def measure(fn, n):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    size = fn(n)
+    elapsed = time.perf_counter() - t0
+    _cur, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, peak, elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=5000)
+    args = ap.parse_args()
+
+    for name, fn in (("before", before), ("after", after)):
+        size, peak, elapsed = measure(fn, args.rows)
+        print(f"{name:<7} rows={args.rows} size={size / 1024:.0f}KB peak={peak / 1024 / 1024:.1f}MB time={elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
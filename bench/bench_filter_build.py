@@ -0,0 +1,68 @@
+"""
+課程篩選 statement 建構 / 編譯的 Python 端成本（不連 DB）
+
+before: 每個請求重新組 select()（每次都要重算 cache key，第一次遇到還要 compile）
+after : course_filters 依 shape 快取的 select()，cache key 已 memoize，直接命中 compiled cache
+
+用法:
+    python -m bench.bench_filter_build --runs 20000
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy.dialects import postgresql
+
+from app.utils.course_filters import CourseFilters, page_stmt
+
+CASES = {
+    "semester": CourseFilters.build(semester="1141"),
+    "keyword": CourseFilters.build(keyword="程式", semester="1141"),
+    "dept+teacher": CourseFilters.build(semester="1141", department="資工", teacher="王"),
+    "slots+time": CourseFilters.build(
+        semester="1141", time_slots=["1-1", "1-2", "3-5"], slot_mode="within", weekday=3, end_section=8,
+    ),
+}
+
+
+def build_uncached(f: CourseFilters):
+    stmt = page_stmt.__wrapped__(f.shape, True, "favorite", None)
+    stmt._generate_cache_key()
+    return stmt
+
+
+def build_cached(f: CourseFilters):
+    stmt = page_stmt(f.shape, True, "favorite", None)
+    stmt._generate_cache_key()
+    return stmt
+
+
+def run(fn, f, runs):
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn(f)
+        samples.append((time.perf_counter() - t0) * 1e6)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=20000)
+    args = ap.parse_args()
+
+    dialect = postgresql.dialect()
+    print(f"{'case':<14}{'compile us':>12}{'before p50':>12}{'before p99':>12}{'after p50':>12}{'after p99':>12}")
+    for name, f in CASES.items():
+        t0 = time.perf_counter()
+        build_uncached(f).compile(dialect=dialect)
+        compile_us = (time.perf_counter() - t0) * 1e6
+
+        b50, b99 = run(build_uncached, f, args.runs)
+        a50, a99 = run(build_cached, f, args.runs)
+        print(f"{name:<14}{compile_us:>12.1f}{b50:>12.1f}{b99:>12.1f}{a50:>12.1f}{a99:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
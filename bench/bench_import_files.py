@@ -0,0 +1,69 @@
+"""
+多檔 / 多工作表匯入解析：逐一解析（舊） vs process pool（course_import.parse_course_files）
+
+產生 --files 個 xlsx，每個 --sheets 個工作表（每表 --rows 列，課號跨檔重複），檢查兩種結果相同
+
+用法:
+    python -m bench.bench_import_files --files 4 --sheets 3 --rows 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import pandas as pd
+
+from app.utils.course_import import merge_parsed, parse_course_files, parse_course_frame, read_course_table
+from bench.bench_import_parse import messy_frame
+
+
+def write_workbooks(tmp: str, n_files: int, n_sheets: int, rows: int):
+    files = []
+    for i in range(n_files):
+        path = os.path.join(tmp, f"college_{i}.xlsx")
+        with pd.ExcelWriter(path) as w:
+            for j in range(n_sheets):
+                messy_frame(rows, seed=i * 100 + j).to_excel(w, sheet_name=f"S{j}", index=False)
+        files.append((path, os.path.basename(path)))
+    return files
+
+
+def sequential(files):
+    parts = []
+    for path, name in files:
+        with pd.ExcelFile(path) as xf:
+            sheets = xf.sheet_names
+        for sheet in sheets:
+            parts.append(parse_course_frame(read_course_table(path, name, sheet_name=sheet)))
+    return merge_parsed(parts)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--files", type=int, default=4)
+    ap.add_argument("--sheets", type=int, default=3)
+    ap.add_argument("--rows", type=int, default=5000)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = write_workbooks(tmp, args.files, args.sheets, args.rows)
+
+        t0 = time.perf_counter()
+        old = sequential(files)
+        t_old = time.perf_counter() - t0
+
+        parse_course_files(files[:1] * 2)  # 先把 pool 暖起來（spawn 啟動不算進去）
+        t0 = time.perf_counter()
+        new = parse_course_files(files)
+        t_new = time.perf_counter() - t0
+
+    for name in ("departments", "teachers", "courses", "times"):
+        assert getattr(old, name) == getattr(new, name), f"{name} differs"
+    print(
+        f"equivalent: yes  files={args.files} sheets={args.sheets} rows/sheet={args.rows} "
+        f"courses={len(new.courses)}  sequential={t_old:.2f}s  pool={t_new:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
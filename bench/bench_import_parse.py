@@ -0,0 +1,146 @@
+"""
+匯入課表解析：逐列 iterrows（舊） vs 整欄運算（course_import.parse_course_frame）
+
+同時檢查兩種結果完全相同（含各種髒資料：空白、"nan"、小數、inf、"3-5"、"2,x"、重複課號...）
+
+用法:
+    python -m bench.bench_import_parse --rows 10000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.utils.course_import import (
+    UNKNOWN_TEACHER, ParsedImport, content_hash, parse_course_frame, to_str, to_int, parse_sections,
+)
+from app.utils.timeslots import ranges_to_mask, mask_to_bits
+
+
+def parse_rows(df: pd.DataFrame) -> ParsedImport:
+    """
+    逐列參考實作：逐列呼叫 to_str / to_int / parse_sections
+    課程欄位以第一列為準，時段收集該課號所有列（去重）
+    """
+    out = ParsedImport()
+    for _, row in df.iterrows():
+        dept_id = to_str(row.get("系所代碼"))
+        if dept_id:
+            out.departments.setdefault(dept_id, "")
+
+        teacher_id = to_str(row.get("主開課教師代碼(舊碼)")) or to_str(row.get("授課教師代碼(舊碼)"))
+        teacher_name = to_str(row.get("主開課教師姓名")) or to_str(row.get("授課教師姓名"))
+        if teacher_id and (teacher_name or teacher_id not in out.teachers):
+            out.teachers[teacher_id] = teacher_name or UNKNOWN_TEACHER
+
+        course_id = to_str(row.get("科目代碼(新碼全碼)"))
+        if not course_id:
+            continue
+
+        if course_id not in out.courses:
+            out.courses[course_id] = first_row_course(row, course_id, dept_id, teacher_id)
+            out.times[course_id] = []
+
+        weekday = to_int(row.get("上課星期"))
+        sections = to_str(row.get("上課節次"))
+        if weekday is not None and sections:
+            start, end = parse_sections(sections)
+            if start is not None and end is not None:
+                t = {
+                    "course_id": course_id, "weekday": weekday, "start_section": start,
+                    "end_section": end, "classroom": to_str(row.get("上課地點")),
+                }
+                if t not in out.times[course_id]:
+                    out.times[course_id].append(t)
+
+    for course_id, c in out.courses.items():
+        times = out.times[course_id]
+        c["time_mask"] = mask_to_bits(
+            ranges_to_mask((t["weekday"], t["start_section"], t["end_section"]) for t in times)
+        )
+        c["content_hash"] = content_hash(c, times)
+    return out
+
+
+def first_row_course(row, course_id, dept_id, teacher_id) -> dict:
+    return {
+        "id": course_id,
+        "name_zh": to_str(row.get("科目中文名稱")) or "",
+        "name_en": to_str(row.get("科目英文名稱")),
+        "department_id": dept_id or "unknown",
+        "teacher_id": teacher_id or "unknown",
+        "grade": to_int(row.get("年級")),
+        "class_group": to_str(row.get("上課班組")),
+        "group_code": to_str(row.get("科目組別")),
+        "credit": to_int(row.get("學分數")) or 0,
+        "required_type": to_str(row.get("課別名稱")),
+        "category": to_str(row.get("課別代碼")),
+        "limit_max": to_int(row.get("上課人數")),
+        "chinese_summary": to_str(row.get("課程中文摘要")),
+        "english_summary": to_str(row.get("課程英文摘要")),
+        "raw_remark": to_str(row.get("課表備註")),
+        "semester": to_str(row.get("學期")),
+    }
+
+
+def messy_frame(n: int, seed: int = 0) -> pd.DataFrame:
+    rnd = random.Random(seed)
+
+    def pick(*choices):
+        return rnd.choice(choices)
+
+    rows = []
+    for i in range(n):
+        rows.append({
+            "系所代碼": pick(f"D{i % 30:02d}", f" D{i % 30:02d} ", None, np.nan, "", "nan"),
+            "主開課教師代碼(舊碼)": pick(f"T{i % 500:04d}", None, "  "),
+            "主開課教師姓名": pick(f"教師{i % 500}", None, ""),
+            "授課教師代碼(舊碼)": pick(f"T{i % 700:04d}", None),
+            "授課教師姓名": pick(f"老師{i % 700}", np.nan),
+            "科目代碼(新碼全碼)": pick(f"C{i:07d}", f"C{max(i - 1, 0):07d}", None, f" C{i:07d}"),
+            "科目中文名稱": pick(f"課程{i}", None, " "),
+            "科目英文名稱": pick(f"Course {i}", np.nan),
+            "年級": pick(1, 2.0, "3", " 4 ", "x", None, np.nan, float("inf"), "2.7"),
+            "上課班組": pick("A", None),
+            "科目組別": pick("", "G1"),
+            "學分數": pick(3, "2", 0, None, "abc", 1.5),
+            "課別名稱": pick("專業必修(系所)", None),
+            "課別代碼": pick(1, "2", None),
+            "上課人數": pick(60, "45", None, "-3"),
+            "課程中文摘要": pick("摘要", None),
+            "課程英文摘要": pick("summary", None),
+            "課表備註": pick(None, "備註"),
+            "學期": pick("1141", 1141, 1141.0, None),
+            "上課星期": pick(1, "2", 3.0, None, "x", 8),
+            "上課節次": pick("2,3,4", "3-5", "7", " 1 , 2 ", "2,x", "", None, ",", "25"),
+            "上課地點": pick("B101", None, " "),
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=10000)
+    args = ap.parse_args()
+
+    df = messy_frame(args.rows)
+
+    t0 = time.perf_counter()
+    old = parse_rows(df)
+    t_old = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new = parse_course_frame(df)
+    t_new = time.perf_counter() - t0
+
+    for name in ("departments", "teachers", "courses", "times"):
+        a, b = getattr(old, name), getattr(new, name)
+        assert a == b, f"{name} differs"
+        assert list(a) == list(b), f"{name} order differs"
+    print(f"equivalent: yes  rows={args.rows}  iterrows={t_old:.3f}s  vectorized={t_new:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
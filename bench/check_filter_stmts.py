@@ -0,0 +1,65 @@
+"""
+各篩選組合下，course_filters 的每個 statement 都要能 compile（不連 DB）
+
+特別是 export_stmt：外層 outer join CourseTime，時段 EXISTS 子查詢不能被 auto-correlate 掉
+
+用法:
+    python -m bench.check_filter_stmts
+"""
+import itertools
+
+from sqlalchemy.dialects import postgresql
+
+from app.utils.course_filters import (
+    CourseFilters, count_stmt, export_stmt, facet_stmt, ids_stmt, page_stmt,
+)
+
+# 每種時段條件單獨、以及和時段格子（any / within）組合
+TIME_FILTERS = {
+    "weekday": {"weekday": 3},
+    "start_section": {"start_section": 2},
+    "end_section": {"end_section": 8},
+    "weekday+sections": {"weekday": 3, "start_section": 2, "end_section": 8},
+}
+SLOTS = {
+    "no slots": {},
+    "slots any": {"time_slots": ["1-1", "3-5"], "slot_mode": "any"},
+    "slots within": {"time_slots": ["1-1", "3-5"], "slot_mode": "within"},
+}
+
+BUILDERS = {
+    "ids": ids_stmt,
+    "count": count_stmt,
+    "page": lambda shape: page_stmt(shape, True, "favorite", "fav_true"),
+    "export": export_stmt,
+    "facet": facet_stmt,
+}
+
+
+def main():
+    dialect = postgresql.dialect()
+    cases = [({}, "semester only")] + [
+        ({**tf, **sl}, f"{tn} / {sn}")
+        for (tn, tf), (sn, sl) in itertools.product(TIME_FILTERS.items(), SLOTS.items())
+    ] + [(SLOTS[n], n) for n in ("slots any", "slots within")]
+
+    failed = 0
+    for kwargs, name in cases:
+        f = CourseFilters.build(semester="1141", **kwargs)
+        for bname, build in BUILDERS.items():
+            try:
+                sql = str(build(f.shape).compile(dialect=dialect))
+            except Exception as e:
+                failed += 1
+                print(f"FAIL {name:<34}{bname:<8}{type(e).__name__}: {e}")
+                continue
+            has_time = f.weekday is not None or f.start_section is not None or f.end_section is not None
+            if has_time and "course_time AS" not in sql:
+                failed += 1
+                print(f"FAIL {name:<34}{bname:<8}time EXISTS missing")
+    print(f"{len(cases) * len(BUILDERS) - failed} ok, {failed} failed")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
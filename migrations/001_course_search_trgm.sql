@@ -0,0 +1,24 @@
+-- 課程關鍵字 / 教師 / 系所名稱搜尋用的 pg_trgm GIN 索引
+-- ILIKE '%k%' 可以直接走這些索引（不用改成別的運算子）
+--
+-- 注意：
+--   * 中文要能切 trigram，資料庫的 LC_CTYPE 必須是 UTF-8 locale（例如 zh_TW.UTF-8 / C.UTF-8），
+--     LC_CTYPE=C 時中文字元會被當成分隔符號，查詢結果仍正確但不會用到索引
+--   * 少於 3 個字的關鍵字無法產生完整 trigram，會退回掃描索引全部項目
+--
+-- 執行：psql -d Course -f migrations/001_course_search_trgm.sql
+-- （CONCURRENTLY 不能包在 transaction 裡，psql 預設 autocommit 即可）
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_courses_name_zh_trgm
+    ON courses USING gin (name_zh gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_courses_name_en_trgm
+    ON courses USING gin (name_en gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_teachers_name_trgm
+    ON teachers USING gin (name gin_trgm_ops);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_departments_name_trgm
+    ON departments USING gin (name gin_trgm_ops);
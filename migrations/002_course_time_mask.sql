@@ -0,0 +1,22 @@
+-- 每門課的「星期 x 節次」佔用 bitmask（7 天 x 20 節 = 140 bits）
+-- 第 (weekday - 1) * 20 + (section - 1) 個 bit（由左數，從 0 開始）代表 星期 weekday 第 section 節
+-- 新增 / 修改 / 匯入課程時由應用程式維護；這裡只負責加欄位並回填既有資料
+--
+-- 執行：psql -d Course -f migrations/002_course_time_mask.sql
+
+ALTER TABLE courses ADD COLUMN IF NOT EXISTS time_mask bit(140);
+
+UPDATE courses c
+SET time_mask = (
+    SELECT string_agg(
+        CASE WHEN EXISTS (
+            SELECT 1 FROM course_time t
+            WHERE t.course_id = c.id
+              AND t.weekday = i / 20 + 1
+              AND t.start_section <= i % 20 + 1
+              AND t.end_section >= i % 20 + 1
+        ) THEN '1' ELSE '0' END,
+        '' ORDER BY i
+    )
+    FROM generate_series(0, 139) AS i
+)::bit(140);
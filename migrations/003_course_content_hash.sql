@@ -0,0 +1,7 @@
+-- 匯入用的課程內容雜湊（sha256 hex）：課程欄位 + 時段，算法見 app/utils/course_import.py content_hash()
+-- 由 /admin/import 寫入；後台手動修改課程時清成 NULL（下次匯入一律視為有變）
+-- 既有資料不回填：第一次以 mode=update 匯入時會補上
+--
+-- 執行：psql -d Course -f migrations/003_course_content_hash.sql
+
+ALTER TABLE courses ADD COLUMN IF NOT EXISTS content_hash varchar(64);
@@ -0,0 +1,6 @@
+-- 使用者 token 版本：JWT 帶 tv claim，和這裡不同就視為已撤銷
+-- 重設密碼、改角色 / 帳號時 +1（見 app/utils/auth.py revoke_tokens）；舊 token 沒有 tv，照舊查 users
+--
+-- 執行：psql -d Course -f migrations/004_user_token_version.sql
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version integer NOT NULL DEFAULT 0;